@@ -16,29 +16,27 @@
 #   as well as a way to launch the application.
 
 
-# monkey patch everything ahead of time
-from gevent import monkey
-monkey.patch_all()
-
-import asyncio, getpass, os, sys
+import argparse, getpass, os, sys
 import aiohttp, aiohttp_jinja2, jinja2
-import config, simplejson
+import config
 
 # change the Provider import here if you want to use different one
 #   You'll need to change it below too where I have marked
 from senslify.db import (
-    database_shutdown_handler, MongoProvider, PostGresProvider, SQLServerProvider
+    database_startup_handler, database_shutdown_handler, MongoProvider,
+    PostGresProvider, SQLServerProvider
 )
 from senslify.errors import DBError, traceback_str
 
 # import the various route handlers
-from senslify.index import index_handler
+from senslify.index import index_handler, index_startup_handler
 from senslify.rest import rest_handler
 from senslify.sensors import info_handler, sensors_handler
 from senslify.sockets import socket_shutdown_handler, ws_handler
 
 # import the filters module, import filters on an as needed basis
 import senslify.filters
+import senslify.serialize
 
 
 def create_db(conn_str, db_provider, auth_required):
@@ -102,13 +100,15 @@ def get_local_ip():
     return IP
 
 
-def build_app(config_file='./senslify/config/senslify.conf'):
+def build_app(config_file='./senslify/config/senslify.conf', force_reset=False):
     """ Factory function that creates a new instance of the server with
     the given configuration.
 
     Arguments:
         config_file (str): The path to the configuration file to use with the
         server (default ./senslify.conf).
+        force_reset (boolean): Whether to delete and reinitialize an existing
+        Senslify database (default: False).
     """
     # create the application and setup the file loader
     print('Configuring jinja2 template engine...')
@@ -121,8 +121,9 @@ def build_app(config_file='./senslify/config/senslify.conf'):
     filters = {
         "date": senslify.filters.filter_date, # YYYY-MM-DD date format
         "datetime": senslify.filters.filter_datetime, # i18n datetime filter
-        "simplejson_dumps": simplejson.dumps,
-        "rstring": senslify.filters.filter_reading # custom reading filter
+        "json_dumps": senslify.serialize.dumps_str,
+        "rstring": senslify.filters.filter_reading, # custom reading filter
+        "rstrings": senslify.filters.filter_readings # batch reading filter
     }
 
     # setup the root url for static content like js/css
@@ -144,8 +145,7 @@ def build_app(config_file='./senslify/config/senslify.conf'):
             app['config'].db_provider,
             app['config'].auth_required
         )
-        app['db'].open()
-        app['db'].init()
+        app['db'].init(force_reset=force_reset)
     except Exception as e:
         if app['config'].debug:
             print(traceback_str(e))
@@ -156,6 +156,12 @@ def build_app(config_file='./senslify/config/senslify.conf'):
     # setup the ws rooms
     app['rooms'] = dict()
 
+    # setup the cache of serialized REST listings
+    app['json_cache'] = dict()
+
+    # setup the cache of rendered pages
+    app['page_cache'] = dict()
+
     # register resources for the routes
     app.router.add_resource(r'/', name='index')
     app.router.add_resource(r'/sensors', name='sensors')
@@ -170,9 +176,16 @@ def build_app(config_file='./senslify/config/senslify.conf'):
     app.router.add_route('GET', '/ws', ws_handler)
     app.router.add_route('POST', '/rest', rest_handler)
 
-    # register any shutdown handlers
-    app.on_shutdown.append(database_shutdown_handler)
+    # open the shared database connection once the event loop is running
+    app.on_startup.append(database_startup_handler)
+    # render the index page once the database is open, so the first
+    #   visitor is served from the page cache
+    app.on_startup.append(index_startup_handler)
+
+    # register any shutdown handlers, the sockets are closed while shutting
+    #   down and the database only once every handler has finished
     app.on_shutdown.append(socket_shutdown_handler)
+    app.on_cleanup.append(database_shutdown_handler)
 
     # initialize the service worker if necessary
     if bool(app['config'].migration_enabled):
@@ -187,11 +200,16 @@ def main():
     a configuration file to use with the server.
     """
 
+    parser = argparse.ArgumentParser(description='Launches the Senslify server.')
+    parser.add_argument('config_file', nargs='?',
+        default='./senslify/config/senslify.conf',
+        help='The path to the configuration file to use with the server.')
+    parser.add_argument('--force-reset', action='store_true',
+        help='Delete and reinitialize an existing Senslify database.')
+    args = parser.parse_args()
+
     # get the app
-    if len(sys.argv) == 2:
-        app = build_app(config_file=sys.argv[2])
-    else:
-        app = build_app()
+    app = build_app(config_file=args.config_file, force_reset=args.force_reset)
     # launch the web app
     ip = app['config'].ip
     if ip:
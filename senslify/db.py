@@ -30,11 +30,129 @@
 #   a secondary provider for the Senslify web application.
 
 
-import asyncio, bson, pymongo, pyodbc, sys
-from contextlib import contextmanager
+import abc, asyncio, functools, hashlib, inspect, itertools, motor.motor_asyncio, pymongo, pyodbc, time
+from collections import OrderedDict
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from bson.son import SON
+from contextlib import asynccontextmanager
 from senslify.errors import DBError
 
 
+# codec options that leave documents as undecoded BSON
+_RAW_BSON = CodecOptions(document_class=RawBSONDocument)
+
+# Motor clients shared by every MongoProvider in the process, keyed by the
+#   connection string and every client setting (the password only as a
+#   digest) and stored as [client, number of open providers]
+_CLIENTS = dict()
+
+# projection that drops the _id field, shared instead of built per query
+_NO_ID = {'_id': False}
+
+# projections listing only the fields the handlers and templates use
+_READING_FIELDS = {'_id': False, 'ts': True, 'val': True, 'rtypeid': True}
+_SENSOR_FIELDS = {'_id': False, 'sensorid': True, 'groupid': True, 'alias': True}
+
+# readings index keys shared by init() and the query hints
+_READINGS_UNIQUE = [
+    ("sensorid", pymongo.ASCENDING),
+    ("groupid", pymongo.ASCENDING),
+    ("rtypeid", pymongo.ASCENDING),
+    ("ts", pymongo.ASCENDING)
+]
+_READINGS_BY_SENSOR = [
+    ("sensorid", pymongo.ASCENDING),
+    ("groupid", pymongo.ASCENDING),
+    ("ts", pymongo.DESCENDING)
+]
+_READINGS_BY_GROUP = [
+    ("groupid", pymongo.ASCENDING),
+    ("rtypeid", pymongo.ASCENDING),
+    ("ts", pymongo.DESCENDING)
+]
+
+# the accumulators used by the stats aggregations, keyed by the stat name
+_STATS_GROUP = {
+    'avg': {'$avg': '$val'},
+    'min': {'$min': '$val'},
+    'max': {'$max': '$val'},
+    'std': {'$stdDevPop': '$val'},
+    'n': {'$sum': 1}
+}
+
+# flattens the grouped stats, readings without a numeric value leave an
+#   accumulator null so default those to zero on the server
+_STATS_PROJECT = {
+    '_id': False,
+    'avg': {'$ifNull': ['$avg', 0]},
+    'min': {'$ifNull': ['$min', 0]},
+    'max': {'$ifNull': ['$max', 0]},
+    'std': {'$ifNull': ['$std', 0]},
+    'n': True
+}
+
+
+def _translate_errors(fn):
+    """Decorator that re-raises any exception escaping a provider method as
+    a DBError caused by it, so the methods do not each need their own
+    try/except. Works on both coroutine and async generator functions.
+
+    Args:
+        fn (function): The provider method to wrap.
+
+    Returns:
+        (function): The wrapped method.
+    """
+    if inspect.isasyncgenfunction(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            try:
+                async for item in fn(*args, **kwargs):
+                    yield item
+            except DBError:
+                raise
+            except Exception as e:
+                raise DBError from e
+    else:
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await fn(*args, **kwargs)
+            except DBError:
+                raise
+            except Exception as e:
+                raise DBError from e
+    return wrapper
+
+
+def _empty_stats():
+    """Returns the stats reported for a sensor without any readings.
+
+    Returns:
+        (dict): A stats dict where every stat is zero.
+    """
+    return {'avg': 0, 'min': 0, 'max': 0, 'std': 0, 'n': 0}
+
+
+async def database_startup_handler(app):
+    """Defines a handler for opening the application database once the event
+    loop is running. The provider, and its connection pool, is shared by
+    every request for the lifetime of the application.
+
+    Args:
+        app (aiohttp.web.Application): An instance of the Senslify application.
+    """
+    if 'db' in app:
+        app['db'].open()
+        # connect ahead of the first request, a server that is not up yet is
+        #   not fatal since the pool keeps retrying in the background
+        try:
+            await app['db'].warmup()
+        except DBError as e:
+            print(f'WARNING: {str(e)}')
+
+
 async def database_shutdown_handler(app):
     """Defines a handler for gracefully shutting down the application database.
 
@@ -46,13 +164,14 @@ async def database_shutdown_handler(app):
         del app['db']
 
 
-class DatabaseProvider:
+class DatabaseProvider(abc.ABC):
     """Defines a generic database interface. Classes should derive from this
     interface and implement its methods in order to provide an alternative
     """
 
-    # The batch size to use when inserting
-    BATCH_SIZE = 100
+    # The batch size to use when inserting, large batches amortize the
+    #   round-trip to the database server across many rows
+    BATCH_SIZE = 1000
 
     # The number of documents to return in a single database call
     DOC_LIMIT= 100
@@ -60,8 +179,8 @@ class DatabaseProvider:
 
     def __init__(self, conn_str, db):
         """Returns an instance of a DatabaseProvider. Do not call this function.
-        All of the methods defined by the DatabaseProvider class will raise a
-        NotImplementedError when called.
+        The DatabaseProvider class is abstract, a subclass that does not
+        implement all of its methods cannot be instantiated.
 
         Args:
             conn_str (str): The connection string for the database server.
@@ -73,13 +192,14 @@ class DatabaseProvider:
 
 
     @staticmethod
-    @contextmanager
-    def get_connection(conn_str, db):
+    @asynccontextmanager
+    @abc.abstractmethod
+    async def get_connection(conn_str, db):
         """Gets a connection to the backing database server.
 
-        This method shall be implemented as a generator function, shall yield
-        an instance of a DatabaseProvider, and shall close the provider when
-        done.
+        This method shall be implemented as an asynchronous generator function,
+        shall yield an instance of a DatabaseProvider, and shall close the
+        provider when done. Use it via 'async with'.
 
         Args:
             conn_str (str): The connection string to the database server.
@@ -88,28 +208,33 @@ class DatabaseProvider:
         Returns:
             DatabaseProvider: A temporary database provider.
         """
-        raise NotImplementedError
+        ...
 
 
+    @abc.abstractmethod
     async def close(self):
         """Closes the connection to the backing database provider."""
-        raise NotImplementedError
+        ...
 
 
-    def init(self, migration):
+    @abc.abstractmethod
+    def init(self, migration, force_reset=False):
         """Initializes the database with the initial table design dictated in
         'Docs/DB.md'.
 
-        This command should either fail soft or prompt the user
-        to confirm deletion of the database if the database already exists.
+        This command should fail soft if the database already exists, unless
+        force_reset is set, in which case the database is deleted first.
 
         Arguments:
             migration (boolean): Whether the database is a migration database
             or not.
+            force_reset (boolean): Whether to delete an existing database
+            (default: False).
         """
-        raise NotImplementedError
+        ...
 
 
+    @abc.abstractmethod
     async def delete_group(self, groupid):
         """Deletes the indicated group from the database. This operation cascades
         to sensors and readings.
@@ -120,9 +245,10 @@ class DatabaseProvider:
         Returns:
             (int): The number of records that are deleted.
         """
-        raise NotImplementedError
+        ...
 
 
+    @abc.abstractmethod
     async def delete_reading(self, sensorid, groupid, rtypeid, ts):
         """Deletes the indicated reading from the database.
 
@@ -135,9 +261,10 @@ class DatabaseProvider:
         Returns:
             (int): The number of records that are deleted.
         """
-        raise NotImplementedError
+        ...
 
 
+    @abc.abstractmethod
     async def delete_readings(self, sensorid, groupid, rtypeid=None):
         """Deletes all readings for the indicated sensor. if rtypeid is not
         None, only deletes readings that match the specified reading type.
@@ -150,9 +277,10 @@ class DatabaseProvider:
         Returns:
             (int): The number of records that are deleted. 
         """
-        raise NotImplementedError
+        ...
 
 
+    @abc.abstractmethod
     async def delete_rtype(self, rtypeid):
         """Deletes the indicated rtype from the database. This operation 
         cascades to readings.
@@ -163,9 +291,10 @@ class DatabaseProvider:
         Returns:
             (int): The number of records that are deleted.
         """
-        raise NotImplementedError
+        ...
 
 
+    @abc.abstractmethod
     async def delete_sensor(self, groupid, sensorid):
         """Deletes the indicated sensor from the database. This operation
         cascades to readings.
@@ -177,9 +306,10 @@ class DatabaseProvider:
         Returns:
             (int): The number of records that are deleted.
         """
-        raise NotImplementedError
+        ...
 
 
+    @abc.abstractmethod
     async def does_group_exist(self, groupid):
         """Determines if the specifiied group exists in the database.
 
@@ -189,9 +319,10 @@ class DatabaseProvider:
         Returns:
             (boolean): True if the group exists, False otherwise.
         """
-        raise NotImplementedError
+        ...
 
 
+    @abc.abstractmethod
     async def does_rtype_exist(self, rtypeid):
         """Determines if the specified sensor exists in the database.
 
@@ -201,9 +332,10 @@ class DatabaseProvider:
         Returns:
             (boolean): True if the reading type exists, False otherwise.
         """
-        raise NotImplementedError
+        ...
 
 
+    @abc.abstractmethod
     async def does_sensor_exist(self, sensorid, groupid):
         """Determines if the specified sensor exists in the database.
 
@@ -214,14 +346,30 @@ class DatabaseProvider:
         Returns:
             (boolean): True if the sensor sensor exists, False otherwise.
         """
-        raise NotImplementedError
+        ...
+
+
+    @abc.abstractmethod
+    async def find_missing_sensors(self, sensors):
+        """Determines which of the given sensors do not exist in the database
+        using a single query rather than one query per sensor.
+
+        Args:
+            sensors (set): A set of (sensorid, groupid) tuples to check for.
+
+        Returns:
+            (set): The subset of sensors that are not in the database.
+        """
+        ...
 
 
+    @abc.abstractmethod
     async def find_max_groupid(self):
         '''Determines the maximum groupid stored in the database.'''
-        raise NotImplementedError
+        ...
 
 
+    @abc.abstractmethod
     async def find_max_sensorid_in_group(self, groupid):
         '''Determines the maximum sensor identifier stored in the database for the 
         specified group.
@@ -229,29 +377,45 @@ class DatabaseProvider:
         Arguments:
             groupid (int): A group identifier that the sensor will be provisioned with.
         '''
-        raise NotImplementedError
+        ...
 
 
+    @abc.abstractmethod
     async def get_groups(self):
-        """Generator function used to get groups from the database."""
-        raise NotImplementedError
+        """Gets every group from the database.
 
+        Returns:
+            (list): A list of the groups in the database.
+        """
+        ...
 
+
+    @abc.abstractmethod
     async def get_rtypes(self):
-        """Generator function used to get reading types from the database."""
-        raise NotImplementedError
+        """Gets every reading type from the database.
+
+        Returns:
+            (list): A list of the reading types in the database.
+        """
+        ...
 
 
+    @abc.abstractmethod
     async def get_sensors(self, groupid):
-        """Generator function used to get sensors from the database.
+        """Gets every sensor in a group from the database.
 
         Args:
             groupid (int): The id of the group to return sensors from.
+
+        Returns:
+            (list): A list of the sensors in the group.
         """
-        raise NotImplementedError
+        ...
 
 
-    async def get_readings(self, sensorid, groupid, rtype=None, limit=DOC_LIMIT):
+    @abc.abstractmethod
+    async def get_readings(self, sensorid, groupid, rtype=None, limit=DOC_LIMIT,
+            raw=False, batch_size=None, window=None):
         """Generator function for retrieving readings from the database.
 
         Args:
@@ -259,39 +423,66 @@ class DatabaseProvider:
             groupid (int): The id of the group the sensor belongs to.
             rtypeid (int): The id of the rtype corresponding the reading type to return (default: None).
             limit (int): The number of readings to return in a single call (default: 100).
+            raw (boolean): Whether to yield readings in the providers native
+            wire format without decoding them (default: False). Providers
+            without a native format ignore this.
+            batch_size (int): The number of readings fetched from the server
+            at a time (default: None, lets the provider pick from the limit).
+            window (int): Only return readings taken in the last window
+            seconds (default: None, no time bound).
         """
-        raise NotImplementedError
+        ...
 
 
+    @abc.abstractmethod
     async def insert_group(self, groupid, alias):
         """Inserts a group into the database.
 
         Args:
             groupid (int): The id of the group.
             alias (str): The human readable alias for the group.
+
+        Returns:
+            (tuple): Whether the group was inserted and a DBError, or None if
+            it was. A group that already exists is not overwritten and is
+            reported as an error.
         """
-        raise NotImplementedError
+        ...
 
 
+    @abc.abstractmethod
     async def insert_reading(self, reading):
         """Inserts a single reading into the database.
 
         Args:
             reading (dict): The reading to insert into the database.
+
+        Returns:
+            (tuple): Whether the reading was inserted and a DBError, or None
+            if there was no error.
         """
-        raise NotImplementedError
+        ...
 
 
-    async def insert_readings(self, readings, batch_size=BATCH_SIZE):
+    @abc.abstractmethod
+    async def insert_readings(self, readings, batch_size=BATCH_SIZE,
+            fast_insert=False):
         """Inserts multiple readings into the database.
 
         Args:
             readings (list): A list of readings to insert into the database.
             batch_size (int): The amount of readings to insert per batch.
+            fast_insert (boolean): Whether to skip waiting for the database
+            to acknowledge the writes, where supported (default: False).
+
+        Returns:
+            (tuple): The number of readings inserted and a DBError, or None if
+            every reading was either inserted or already in the database.
         """
-        raise NotImplementedError
+        ...
 
 
+    @abc.abstractmethod
     async def insert_sensor(self, sensorid, groupid, alias):
         """Inserts a sensorboard into the database.
 
@@ -299,29 +490,95 @@ class DatabaseProvider:
             sensorid (int): The id assigned to the sensorboard.
             groupid (int): The id of the group the sensorboard belongs to.
             alias (str): The human readable alias for the sensor.
+
+        Returns:
+            (tuple): Whether the sensor was inserted and a DBError, or None if
+            it was. A sensor that already exists is not overwritten and is
+            reported as an error.
         """
-        raise NotImplementedError
+        ...
+
+
+    def invalidate(self, kind, key=None):
+        """Discards any cached copies of the given kind of document, so the
+        next read goes to the database. Providers that do not cache inherit
+        this method, which does nothing.
+
+        Args:
+            kind (str): One of 'groups', 'rtypes', or 'sensors'.
+            key (int): The id of the group or rtype that changed, or the id
+            of the group whose sensors changed (default: None, invalidates
+            every cached document of the given kind).
+        """
+        pass
 
 
     def is_open(self):
         return self._open
 
 
+    async def warmup(self):
+        """Establishes a connection to the backing database server ahead of
+        the first request. Providers that connect when opened inherit this
+        method, which does nothing.
+        """
+        pass
+
+
+    @abc.abstractmethod
+    async def next_groupid(self):
+        """Allocates the next unused group identifier.
+
+        Returns:
+            (int): A group identifier that no other group has been given.
+        """
+        ...
+
+
+    @abc.abstractmethod
+    async def next_sensorid(self, groupid):
+        """Allocates the next unused sensor identifier in the specified group.
+
+        Arguments:
+            groupid (int): A group identifier that the sensor will be provisioned with.
+
+        Returns:
+            (int): A sensor identifier that no other sensor in the group has
+            been given.
+        """
+        ...
+
+
+    @abc.abstractmethod
     def open(self):
         """Opens a connection to the backing database server."""
-        raise NotImplementedError
+        ...
+
+
+    @abc.abstractmethod
+    async def purge_readings_before(self, ts):
+        """Deletes every reading taken before the given time, regardless of
+        the sensor it belongs to.
+
+        Args:
+            ts (int): A UNIX timestamp, readings older than this are deleted.
+
+        Returns:
+            (int): The number of readings that are deleted.
+        """
+        ...
 
 
-    async def stats_group(self, groupid, rtypeid, start_ts=None, end_ts=None):
+    @abc.abstractmethod
+    async def stats_group(self, groupid, rtypeid, start_ts, end_ts):
         """Returns the stats for an entire group of sensors.
 
         Args:
             groupid (int): The id of the group the sensor belongs to.
             rtypeid (int): The id of the reading type to retrieve stats for.
-            start_ts (datetime.datetime): The start time that begins the range
-            for stats (default:None).
-            end_ts (datetime.datetime): The end time that ends the range for
-            stats (default: None).
+            start_ts (int): The start time that begins the range for stats.
+            end_ts (int): The end time that ends the range for stats,
+            inclusive.
 
         Returns:
             (generator): A Python generator over the stats from the database.
@@ -329,9 +586,10 @@ class DatabaseProvider:
         Raises:
             (Exception): If there was a problem interacting with the database.
         """
-        raise NotImplementedError
+        ...
 
 
+    @abc.abstractmethod
     async def stats_sensor(self, sensorid, groupid, rtypeid, start_ts, end_ts):
         """Returns the stats for a specific sensor.
 
@@ -347,10 +605,12 @@ class DatabaseProvider:
         Raises:
             (Exception): If there was a problem interacting with the database.
         """
-        raise NotImplementedError
+        ...
 
 
-    async def get_readings_by_period(self, sensorid, groupid, start_ts, end_ts):
+    @abc.abstractmethod
+    async def get_readings_by_period(self, sensorid, groupid, start_ts, end_ts,
+            limit=None):
         """Returns all of the readings for a given time period for a given
         sensor.
 
@@ -359,8 +619,10 @@ class DatabaseProvider:
             groupid (int): The id of the group the sensor belongs to.
             start_ts (datetime.datetime): The start time period.
             end_ts (datetime.datetime): The end time period.
+            limit (int): The maximum number of readings to return, newest
+            first, or None for every reading in the period (default: None).
         """
-        raise NotImplementedError
+        ...
 
 
 class MongoProvider(DatabaseProvider):
@@ -368,7 +630,7 @@ class MongoProvider(DatabaseProvider):
     this class represents an individual connection to the MongoDB database.
 
     The functions in this class are asynchronous. To acheive this, I employ
-    gevent and monkey patching. That said, at any time, the result of any
+    the Motor asyncio driver for MongoDB. That said, at any time, the result of any
     of these functions are not guaranteed to be accurate reflections of the
     database (not that they would anyway - in reality, unless a Session object
     is used, MongoDB only provides atomicity at the collection level).
@@ -378,6 +640,43 @@ class MongoProvider(DatabaseProvider):
     #   to running on the server
     MAX_AGGREGATE_MS = 2500
 
+    # the maximum number of connections the client keeps in its pool
+    MAX_POOL_SIZE = 50
+
+    # the number of connections the client keeps open even when idle
+    MIN_POOL_SIZE = 5
+
+    # the number of milliseconds a pooled connection may sit idle
+    MAX_IDLE_MS = 60000
+
+    # the number of connections the pool may be establishing at once, so a
+    #   burst of requests on a cold pool does not storm the server
+    MAX_CONNECTING = 4
+
+    # the number of milliseconds an operation waits for a usable server
+    #   before failing, rather than stalling its handler for 30 seconds
+    SERVER_SELECTION_MS = 2000
+
+    # the wire compressors offered to the server, in order of preference,
+    #   the server picks the first one it also supports
+    COMPRESSORS = 'zstd,snappy,zlib'
+
+    # the zlib level used when zlib is the negotiated compressor, 6 trades a
+    #   little CPU for most of the size reduction of level 9
+    ZLIB_LEVEL = 6
+
+    # the number of seconds groups, rtypes, and sensors are cached for
+    CACHE_TTL = 30
+
+    # the number of seconds group and rtype existence checks are cached for
+    EXISTS_TTL = 60
+
+    # the largest number of documents requested from the server per batch
+    MAX_BATCH_SIZE = 1000
+
+    # the number of readings requested per batch when exporting a period
+    PERIOD_BATCH_SIZE = 10000
+
     def __init__(self, conn_str='mongodb://127.0.0.1:27001', db='senslify',
             username=None, password=None):
         """Returns an object capable of interacting with the Senslify MongoDB
@@ -393,23 +692,43 @@ class MongoProvider(DatabaseProvider):
         """
         DatabaseProvider.__init__(self, conn_str, db)
         # Name mangling is ok, but these should really be stored in encrypted memory
-        if username is str and password is str:
-            self.__username = str(username)
-            self.__password = str(password)
+        if isinstance(username, str) and isinstance(password, str):
+            self.__username = username
+            self.__password = password
         else:
             self.__username = None
             self.__password = None
+        # providers share a client only if every setting that changes the
+        #   client matches, including the credentials and authSource
+        kwargs = self._client_kwargs()
+        password = kwargs.pop('password', None)
+        digest = None if password is None else hashlib.sha256(
+            password.encode('utf-8')).hexdigest()
+        self._client_key = (conn_str, digest, *sorted(kwargs.items()))
+        # groups, rtypes, and sensors rarely change, cache them as
+        #   (docs, timestamp) pairs so page loads do not hit the database
+        self._groups_cache = (None, 0.0)
+        self._rtypes_cache = (None, 0.0)
+        self._sensors_cache = dict()
+        # existence checks run on every upload, cache them as
+        #   {id: (exists, timestamp)} maps
+        self._group_exists_cache = dict()
+        self._rtype_exists_cache = dict()
 
 
     @staticmethod
-    @contextmanager
-    def get_connection(conn_str, db, username=None, password=None):
+    @asynccontextmanager
+    async def get_connection(conn_str, db, username=None, password=None):
         """Generator function that creates a temporary MongoProvider instance to
-        be used within a context manager.
+        be used within an asynchronous context manager ('async with').
+
+        Each call builds a new connection pool, so this is meant for scripts
+        and maintenance tasks. Request handlers should use the provider the
+        application shares under app['db'] instead.
 
-        This method shall be implemented as a generator function, shall yield
-        an instance of a DatabaseProvider, and shall close the provider when
-        done.
+        This method shall be implemented as an asynchronous generator function,
+        shall yield an instance of a DatabaseProvider, and shall close the
+        provider when done.
 
         Arguments:
             conn_str (str): The connection string to the MongoDB server.
@@ -419,8 +738,10 @@ class MongoProvider(DatabaseProvider):
         """
         conn = MongoProvider(conn_str, db, username, password)
         conn.open()
-        yield conn
-        conn.close()
+        try:
+            yield conn
+        finally:
+            await conn.close()
 
 
     async def close(self):
@@ -428,67 +749,176 @@ class MongoProvider(DatabaseProvider):
         if the connection is not opened.
         """
         if self._open:
-            self._conn.close()
+            # only close the shared client once its last provider closes
+            entry = _CLIENTS.get(self._client_key)
+            if entry is not None and entry[0] is self._conn:
+                entry[1] -= 1
+                if entry[1] <= 0:
+                    del _CLIENTS[self._client_key]
+                    self._conn.close()
+            else:
+                self._conn.close()
             self._open = False
 
 
-    def init(self, migration=False):
+    def _client_kwargs(self):
+        """Builds the keyword arguments shared by every client the provider
+        creates.
+
+        Returns:
+            (dict): Keyword arguments for a MongoDB client constructor.
+        """
+        kwargs = {
+            'maxPoolSize': self.MAX_POOL_SIZE,
+            'minPoolSize': self.MIN_POOL_SIZE,
+            'maxIdleTimeMS': self.MAX_IDLE_MS,
+            'maxConnecting': self.MAX_CONNECTING,
+            'serverSelectionTimeoutMS': self.SERVER_SELECTION_MS,
+            'retryWrites': True,
+            'compressors': self.COMPRESSORS,
+            'zlibCompressionLevel': self.ZLIB_LEVEL
+        }
+        if self.__username is not None and self.__password is not None:
+            # pin the auth mechanism so new pooled sockets skip the
+            #   mechanism negotiation round-trip
+            kwargs['username'] = self.__username
+            kwargs['password'] = self.__password
+            kwargs['authMechanism'] = 'SCRAM-SHA-256'
+            kwargs['authSource'] = self._db
+        return kwargs
+
+
+    def _is_fresh(self, cache):
+        """Determines if a (docs, timestamp) cache entry can still be used.
+
+        Args:
+            cache (tuple): A (docs, timestamp) cache entry.
+
+        Returns:
+            (boolean): True if the entry is populated and not expired.
+        """
+        docs, ts = cache
+        return docs is not None and time.monotonic() - ts < self.CACHE_TTL
+
+
+    async def _cached_exists(self, cache, key, coll, query):
+        """Determines if a document matching query exists in coll, consulting
+        and updating the given existence cache.
+
+        Args:
+            cache (dict): An {id: (exists, timestamp)} existence cache.
+            key (int): The identifier to cache the result under.
+            coll (str): The name of the collection to check.
+            query (dict): The filter the document must match.
+
+        Returns:
+            (boolean): True if a matching document exists.
+        """
+        exists, ts = cache.get(key, (None, 0.0))
+        if exists is None or time.monotonic() - ts >= self.EXISTS_TTL:
+            exists = await self._conn[self._db][coll].count_documents(
+                query, limit=1) > 0
+            cache[key] = (exists, time.monotonic())
+        return exists
+
+
+    def init(self, migration=False, force_reset=False):
         """Initializes the database with the initial table design dictated in
-        'docs/DB.rst'. This command will fail-soft if the database already
-        exists.
+        'docs/DB.rst'. If the database already exists, its data is kept and
+        any missing indexes are created, unless force_reset is set.
 
         Arguments:
             migration (boolean): Whether the database is a migration database
             or not (default: False).
-        """
-        if not self._open:
-            print('Cannot initialize database, connection not open!')
-            return
+            force_reset (boolean): Whether to delete an existing Senslify
+            database and start over (default: False).
+        """
+        for kind in ('groups', 'rtypes', 'sensors'):
+            self.invalidate(kind)
+        # initialization runs once at startup, so it uses a short-lived
+        #   synchronous client instead of the Motor client
+        client = pymongo.MongoClient(self._conn_str, **self._client_kwargs())
         try:
-            if self._db in self._conn.list_database_names():
-                if input('Senslify Database detected, do you want to delete it? [y|n]: ').lower() == 'y':
-                    print('Warning: Deleting Senslify database!')
-                    self._conn.drop_database(self._db)
-                else:
-                    # otherwise exit the method, no initialization needed
-                    return
-            # create the indexes on the collections in the database
+            if self._db in client.list_database_names() and force_reset:
+                print('Warning: Deleting Senslify database!')
+                client.drop_database(self._db)
+            # create the indexes on the collections in the database, this
+            #   is a no-op for indexes that already exist, so an existing
+            #   database always ends up with every index the queries expect
             print('Initializing Senslify database...')
-            self._conn[self._db].readings.create_index([
-                ("sensorid", pymongo.ASCENDING),
-                ("groupid", pymongo.ASCENDING),
-                ("rtypeid", pymongo.ASCENDING),
-                ("ts", pymongo.ASCENDING)], unique=True
-            )
+            client[self._db].readings.create_indexes([
+                pymongo.IndexModel(_READINGS_UNIQUE, unique=True),
+                # cascade deletes filter readings by groupid or rtypeid alone
+                pymongo.IndexModel([("groupid", pymongo.ASCENDING)]),
+                pymongo.IndexModel([("rtypeid", pymongo.ASCENDING)]),
+                # supports purging readings older than a given time
+                pymongo.IndexModel([("ts", pymongo.ASCENDING)]),
+                # lets the newest readings for a sensor be read straight off
+                #   the index without an in-memory sort
+                pymongo.IndexModel(_READINGS_BY_SENSOR),
+                # covers the match in the group stats aggregation
+                pymongo.IndexModel(_READINGS_BY_GROUP)
+            ])
             if not migration:
-                self._conn[self._db].sensors.create_index([
+                client[self._db].sensors.create_index([
                     ("sensorid", pymongo.ASCENDING),
                     ("groupid", pymongo.ASCENDING)], unique=True
                 )
-                self._conn[self._db].groups.create_index([
+                # supports finding the largest sensorid in a group
+                client[self._db].sensors.create_index([
+                    ("groupid", pymongo.ASCENDING),
+                    ("sensorid", pymongo.DESCENDING)]
+                )
+                client[self._db].groups.create_index([
                     ("groupid", pymongo.ASCENDING)], unique=True
                 )
-                self._conn[self._db].rtypes.create_index([
+                client[self._db].rtypes.create_index([
                     ("rtypeid", pymongo.ASCENDING),
                     ("rtype", pymongo.ASCENDING)], unique=True
                 )
+                # seed the id counters from the ids already handed out, $max
+                #   never lowers a counter, so this is safe to re-run
+                seeds = [pymongo.UpdateOne(
+                    {"_id": "group"},
+                    {"$max": {"seq": doc["max"] + 1}},
+                    upsert=True
+                ) for doc in client[self._db].groups.aggregate([
+                    {"$group": {"_id": None, "max": {"$max": "$groupid"}}}])]
+                seeds.extend(pymongo.UpdateOne(
+                    {"_id": f'sensor:{doc["_id"]}'},
+                    {"$max": {"seq": doc["max"] + 1}},
+                    upsert=True
+                ) for doc in client[self._db].sensors.aggregate([
+                    {"$group": {"_id": "$groupid", "max": {"$max": "$sensorid"}}}]))
+                if seeds:
+                    client[self._db].counters.bulk_write(seeds)
                 # insert starting rtypes into the database
                 #   if you want more rtypes in the database than this, you'll need to
                 #   insert them through the Mongo shell, I don't provide a way to do so
                 # or you know, you could modify this list too, but it will require
                 #   reinitializing the database, deleting anything in there currently
-                self._conn[self._db].rtypes.insert_many([
-                    # Note that these rtypes match up with the ReadForward TOS App
-                    {"rtypeid": 0, "rtype": "Temperature"},
-                    {"rtypeid": 1, "rtype": "Humidity"},
-                    {"rtypeid": 2, "rtype": "Visible Light"},
-                    {"rtypeid": 3, "rtype": "Infrared Light"},
-                    {"rtypeid": 4, "rtype": "Voltage"}
+                # the rtypes are upserted so re-running init never duplicates them
+                client[self._db].rtypes.bulk_write([
+                    pymongo.UpdateOne(
+                        {"rtypeid": rtype["rtypeid"]},
+                        {"$setOnInsert": rtype},
+                        upsert=True
+                    ) for rtype in [
+                        # Note that these rtypes match up with the ReadForward TOS App
+                        {"rtypeid": 0, "rtype": "Temperature"},
+                        {"rtypeid": 1, "rtype": "Humidity"},
+                        {"rtypeid": 2, "rtype": "Visible Light"},
+                        {"rtypeid": 3, "rtype": "Infrared Light"},
+                        {"rtypeid": 4, "rtype": "Voltage"}
+                    ]
                 ])
         except Exception as e:
-            raise DBError(f'ERROR: {str(e)}')
+            raise DBError from e
+        finally:
+            client.close()
 
 
+    @_translate_errors
     async def delete_group(self, groupid):
         """Deletes the indicated group from the database. This operation cascades
         to sensors and readings.
@@ -501,28 +931,30 @@ class MongoProvider(DatabaseProvider):
         """
         if not self._open:
             raise DBError('ERROR: Cannot delete group from database, database connection is not open!')
-        count = 0
-        try:
-            count += self._conn[self._db].readings.delete_many(
+        self.invalidate('groups', groupid)
+        self.invalidate('sensors', groupid)
+        # the deletes touch separate collections, so run them concurrently
+        results = await asyncio.gather(
+            self._conn[self._db].readings.delete_many(
                 filter={
                     'groupid': groupid
                 }
-            )
-            count += self._conn[self._db].sensors.delete_many(
+            ),
+            self._conn[self._db].sensors.delete_many(
                 filter={
                     'groupid': groupid
                 }
-            )
-            count += self._conn[self._db].groups.delete_one(
+            ),
+            self._conn[self._db].groups.delete_one(
                 filter={
                     'groupid': groupid
                 }
             )
-        except Exception as e:
-            raise DBError(f'ERROR: {str(e)}')
-        return count
+        )
+        return sum(result.deleted_count for result in results)
 
 
+    @_translate_errors
     async def delete_reading(self, sensorid, groupid, rtypeid, ts):
         """Deletes the indicated reading from the database.
 
@@ -537,19 +969,18 @@ class MongoProvider(DatabaseProvider):
         """
         if not self._open:
             raise DBError('ERROR: Cannot delete reading from database, database connection is not open!')
-        try:
-            return self._conn[self._db].readings.delete_one(
-                filter={
-                    'sensorid': sensorid, 
-                    'groupid': groupid, 
-                    'rtypeid': rtypeid, 
-                    'ts': ts
-                }
-            )
-        except Exception as e:
-            raise DBError(f'ERROR: {str(e)}')
+        result = await self._conn[self._db].readings.delete_one(
+            filter={
+                'sensorid': sensorid,
+                'groupid': groupid,
+                'rtypeid': rtypeid,
+                'ts': ts
+            }
+        )
+        return result.deleted_count
 
 
+    @_translate_errors
     async def delete_readings(self, sensorid, groupid, rtypeid=None):
         """Deletes all readings for the indicated sensor. if rtypeid is not
         None, only deletes readings that match the specified reading type.
@@ -564,18 +995,15 @@ class MongoProvider(DatabaseProvider):
         """
         if not self._open:
             raise DBError('ERROR: Cannot delete readings from database, database connection is not open!')
-        count = 0
-        try:
-            if rtypeid:
-                query={'sensorid': sensorid, 'groupid': groupid, 'rtypeid': rtypeid}
-            else:
-                query={'sensorid': sensorid, 'groupid': groupid}
-            count += self._conn[self._db].readings.delete_many(filter=query)
-        except Exception as e:
-            raise DBError(f'ERROR: {str(e)}')
-        return count
+        if rtypeid:
+            query={'sensorid': sensorid, 'groupid': groupid, 'rtypeid': rtypeid}
+        else:
+            query={'sensorid': sensorid, 'groupid': groupid}
+        result = await self._conn[self._db].readings.delete_many(filter=query)
+        return result.deleted_count
 
 
+    @_translate_errors
     async def delete_rtype(self, rtypeid):
         """Deletes the indicated rtype from the database. This operation 
         cascades to readings.
@@ -588,23 +1016,24 @@ class MongoProvider(DatabaseProvider):
         """
         if not self._open:
             raise DBError('ERROR: Cannot delete reading type from database, database connection is not open!')
-        count = 0
-        try:
-            count += self._conn[self._db].readings.delete_many(
+        self.invalidate('rtypes', rtypeid)
+        # the deletes touch separate collections, so run them concurrently
+        results = await asyncio.gather(
+            self._conn[self._db].readings.delete_many(
                 filter={
                     'rtypeid': rtypeid
                 }
-            )
-            count += self._conn[self._db].rtypes.delete_one(
+            ),
+            self._conn[self._db].rtypes.delete_one(
                 filter={
                     'rtypeid': rtypeid
                 }
             )
-        except Exception as e:
-            raise DBError(f'ERROR: {str(e)}')
-        return count
+        )
+        return sum(result.deleted_count for result in results)
 
 
+    @_translate_errors
     async def delete_sensor(self, groupid, sensorid):
         """Deletes the indicated sensor from the database. This operation
         cascades to readings.
@@ -618,25 +1047,26 @@ class MongoProvider(DatabaseProvider):
         """
         if not self._open:
             raise DBError('ERROR: Cannot delete sensor from database, database connection is not open!')
-        count = 0
-        try:
-            count += self._conn[self._db].readings.delete_many(
+        self.invalidate('sensors', groupid)
+        # the deletes touch separate collections, so run them concurrently
+        results = await asyncio.gather(
+            self._conn[self._db].readings.delete_many(
                 filter={
-                    'groupid': groupid, 
+                    'groupid': groupid,
                     'sensorid': sensorid
                 }
-            )
-            count += self._conn[self._db].sensors.delete_one(
+            ),
+            self._conn[self._db].sensors.delete_one(
                 filter={
-                    'groupid': groupid, 
+                    'groupid': groupid,
                     'sensorid': sensorid
                 }
             )
-        except Exception as e:
-            raise DBError(f'ERROR: {str(e)}')
-        return count
+        )
+        return sum(result.deleted_count for result in results)
 
 
+    @_translate_errors
     async def does_group_exist(self, groupid):
         """Determines if the specifiied group exists in the database.
 
@@ -645,13 +1075,11 @@ class MongoProvider(DatabaseProvider):
         """
         if not self._open:
             raise DBError('ERROR: Cannot determine if group exists, database connection not open!')
-        try:
-            return self._conn[self._db].groups.find_one(
-                filter={'groupid': groupid}) is not None
-        except Exception as e:
-            raise DBError(f'ERROR: {str(e)}')
+        return await self._cached_exists(self._group_exists_cache,
+            groupid, 'groups', {'groupid': groupid})
 
 
+    @_translate_errors
     async def does_rtype_exist(self, rtypeid):
         """Determines if the specified sensor exists in the database.
 
@@ -660,13 +1088,11 @@ class MongoProvider(DatabaseProvider):
         """
         if not self._open:
             raise DBError('Cannot determine if rtype exists, database connection not open!')
-        try:
-            return self._conn[self._db].rtypes.find_one(
-                filter={'rtypeid': rtypeid}) is not None
-        except Exception as e:
-            raise DBError(f'ERROR: {str(e)}')
+        return await self._cached_exists(self._rtype_exists_cache,
+            rtypeid, 'rtypes', {'rtypeid': rtypeid})
 
 
+    @_translate_errors
     async def does_sensor_exist(self, sensorid, groupid):
         """Determines if the specified sensor exists in the database.
 
@@ -675,37 +1101,49 @@ class MongoProvider(DatabaseProvider):
         """
         if not self._open:
             raise DBError('Cannot determine if sensor exists, database connection not open!')
-        try:
-            return self._conn[self._db].sensors.find_one(
-                    filter={'sensorid': sensorid,
-                            'groupid': groupid}) is not None
-        except Exception as e:
-            raise DBError(f'ERROR: {str(e)}')
+        # SON pins the key order to match the (sensorid, groupid) index
+        return await self._conn[self._db].sensors.count_documents(
+                SON([('sensorid', sensorid), ('groupid', groupid)]),
+                limit=1) > 0
+
 
+    @_translate_errors
+    async def find_missing_sensors(self, sensors):
+        """Determines which of the given sensors do not exist in the database
+        using a single query rather than one query per sensor.
 
+        Args:
+            sensors (set): A set of (sensorid, groupid) tuples to check for.
+
+        Returns:
+            (set): The subset of sensors that are not in the database.
+        """
+        if not self._open:
+            raise DBError('Cannot determine if sensors exist, database connection not open!')
+        if not sensors:
+            return set()
+        cursor = self._conn[self._db].sensors.find(
+            {'$or': [{'sensorid': sensorid, 'groupid': groupid}
+                for sensorid, groupid in sensors]},
+            {'_id': False, 'sensorid': True, 'groupid': True})
+        existing = {(doc['sensorid'], doc['groupid']) async for doc in cursor}
+        return set(sensors) - existing
+
+
+    @_translate_errors
     async def find_max_groupid(self):
         '''Determines the maximum group identifier stored in the database.
         '''
-        pipeline = [
-            # optimization step - sort descending by group identifier
-            {"$sort":
-                {"groupid": -1}
-            },
-            # project just the max sensorid
-            {"$project": 
-                {"max": {"$max": "$groupid"}}
-            }
-        ]
-        try:
-            with self._conn[self._db].groups.aggregate(pipeline,
-                allowDiskUse=True, maxTimeMS=self.MAX_AGGREGATE_MS) as cursor:
-                doc = cursor.next()
-                if not doc: raise DBError
-                return doc
-        except Exception as e:
-            raise DBError(f'ERROR: {str(e)}')
+        # walk the groupid index backwards, the first document is the max
+        cursor = self._conn[self._db].groups.find({},
+            {'_id': False, 'groupid': True}).sort(
+                'groupid', pymongo.DESCENDING).limit(1)
+        docs = await cursor.to_list(length=1)
+        if not docs: raise DBError
+        return {'max': docs[0]['groupid']}
 
 
+    @_translate_errors
     async def find_max_sensorid_in_group(self, groupid):
         '''Determines the maximum sensor identifier stored in the database for the 
         specified group.
@@ -715,54 +1153,37 @@ class MongoProvider(DatabaseProvider):
         '''
         if not self._open:
             raise DBError('Cannot retrieve stats for sensor, database connection not open!')
-        groupid = int(groupid)
-        pipeline = [
-            # filter by sensorid, groupid, and rtypeid
-            #   these are all indexed so this should be fast
-            {"$match": {
-                    "$and": [{
-                        "groupid": {"$eq": groupid}
-                    }]
-                }
-            },
-            # optimization step - sort descending by sensor identifier
-            {"$sort":
-                {"sensorid": -1}
-            },
-            # project just the max sensorid
-            {"$project": 
-                {"max": {"$max": "$sensorid"}}
-            }
-        ]
-        try:
-            with self._conn[self._db].sensors.aggregate(pipeline,
-                allowDiskUse=True, maxTimeMS=self.MAX_AGGREGATE_MS) as cursor:
-                doc = cursor.next()
-                if not doc: raise DBError
-                return doc
-        except Exception as e:
-            raise DBError(f'ERROR: {str(e)}')
+        # the (groupid, sensorid desc) index covers both the filter and
+        #   the sort, so this is a single index seek
+        cursor = self._conn[self._db].sensors.find({'groupid': groupid},
+            {'_id': False, 'sensorid': True}).sort(
+                'sensorid', pymongo.DESCENDING).limit(1)
+        docs = await cursor.to_list(length=1)
+        if not docs: raise DBError
+        return {'max': docs[0]['sensorid']}
 
 
+    @_translate_errors
     async def get_groups(self):
-        """Generator function used to get groups from the database.
+        """Gets every group from the database.
 
-        Args:
-            batch_size (int): The number of groups to return in each batch.
+        Returns:
+            (list): A list of dicts, one for each group in the database.
         """
         if not self._open:
             raise DBError('Cannot get groups, database connection not open!')
-        try:
-            with self._conn[self._db].groups.find({},
-                    {'_id': False}) as cursor:
-                for doc in cursor:
-                    yield doc
-        except Exception as e:
-            raise DBError(f'ERROR: {str(e)}')
+        if not self._is_fresh(self._groups_cache):
+            docs = await self._conn[self._db].groups.find({},
+                _NO_ID).batch_size(self.DOC_LIMIT).to_list(length=None)
+            self._groups_cache = (docs, time.monotonic())
+        # return copies so callers cannot modify the cached documents
+        return [dict(doc) for doc in self._groups_cache[0]]
 
 
+    @_translate_errors
     async def get_readings(self, sensorid, groupid, rtypeid=None,
-            limit=DatabaseProvider.DOC_LIMIT):
+            limit=DatabaseProvider.DOC_LIMIT, raw=False, batch_size=None,
+            window=None):
         """Generator function for retrieving readings from the database.
 
         Args:
@@ -770,53 +1191,80 @@ class MongoProvider(DatabaseProvider):
             groupid (int): The id of the group the sensor belongs to.
             rtypeid (int): The id of the rtype corresponding the reading type to return (default: None).
             limit (int): The number of readings to return in a single call (default: 100).
+            raw (boolean): Whether to yield RawBSONDocuments instead of decoded
+            dicts (default: False).
+            batch_size (int): The number of readings requested from the server
+            per batch (default: None, the limit capped at MAX_BATCH_SIZE).
+            window (int): Only return readings taken in the last window
+            seconds (default: None, no time bound).
         """
         if not self._open:
             raise DBError('Cannot get readings, database connection not open!')
-        try:
-            if rtypeid:
-                filters = {"sensorid":sensorid, "groupid":groupid, "rtypeid":rtypeid}
-            else:
-                filters = {"sensorid":sensorid, "groupid":groupid}
-            with self._conn[self._db].readings.find(filters, {"_id":False}).sort("ts", pymongo.DESCENDING).limit(limit) as cursor:
-                for doc in cursor:
-                    yield doc
-        except Exception as e:
-            raise DBError(f'ERROR: {str(e)}')
-
-
+        # rtype 0 is a valid reading type, so compare against None
+        if rtypeid is not None:
+            filters = {"sensorid":sensorid, "groupid":groupid, "rtypeid":rtypeid}
+            # equality on every key but ts, walked backwards for the sort
+            hint = _READINGS_UNIQUE
+        else:
+            filters = {"sensorid":sensorid, "groupid":groupid}
+            hint = _READINGS_BY_SENSOR
+        if window is not None:
+            # bounds the index scan, ts is the last key of either index
+            filters["ts"] = {"$gte": int(time.time()) - window}
+        if raw:
+            # raw documents skip decoding BSON into Python objects
+            readings = self._conn[self._db].get_collection('readings',
+                codec_options=_RAW_BSON)
+        else:
+            readings = self._conn[self._db].readings
+        # by default size the batch to the limit so the readings arrive
+        #   in one reply, without letting a large limit fill 16MB replies
+        if batch_size is None:
+            batch_size = min(limit, self.MAX_BATCH_SIZE)
+        cursor = readings.find(filters, _READING_FIELDS).sort("ts", pymongo.DESCENDING).limit(limit).batch_size(
+            batch_size).hint(hint)
+        async for doc in cursor:
+            yield doc
+
+
+    @_translate_errors
     async def get_rtypes(self):
-        """Generator function used to get reading types from the database.
+        """Gets every reading type from the database.
 
-        Args:
-            batch_size (int): The number of reading types to return in each batch.
+        Returns:
+            (list): A list of dicts, one for each reading type in the database.
         """
         if not self._open:
             raise DBError('Cannot get rtypes, database connection not open!')
-        try:
-            with self._conn[self._db].rtypes.find({}, {'_id': False}) as cursor:
-                for doc in cursor:
-                    yield doc
-        except Exception:
-            raise DBError(f'ERROR: {str(e)}')
+        if not self._is_fresh(self._rtypes_cache):
+            docs = await self._conn[self._db].rtypes.find({},
+                _NO_ID).batch_size(self.DOC_LIMIT).to_list(length=None)
+            self._rtypes_cache = (docs, time.monotonic())
+        # return copies so callers cannot modify the cached documents
+        return [dict(doc) for doc in self._rtypes_cache[0]]
 
 
+    @_translate_errors
     async def get_sensors(self, groupid):
-        """Generator function used to get sensors from the database.
+        """Gets every sensor in a group from the database.
 
         Args:
             groupid (int): The id of the group to return sensors from.
-            batch_size (int): The number of sensors to return in a single batch.
+
+        Returns:
+            (list): A list of dicts, one for each sensor in the group.
         """
         if not self._open:
             raise DBError('Cannot get sensors, database connection not open!')
-        try:
-            groupid = int(groupid)
-            with self._conn[self._db].sensors.find({'groupid': groupid}, {'_id': False}) as cursor:
-                for doc in cursor:
-                    yield doc
-        except Exception as e:
-            raise DBError(f'ERROR: {str(e)}')
+        cache = self._sensors_cache.get(groupid, (None, 0.0))
+        if not self._is_fresh(cache):
+            docs = await self._conn[self._db].sensors.find(
+                {'groupid': groupid}, _SENSOR_FIELDS).batch_size(
+                    self.DOC_LIMIT).to_list(length=None)
+            cache = (docs, time.monotonic())
+            self._sensors_cache[groupid] = cache
+        # return copies so callers cannot modify the cached documents
+        return [dict(doc) for doc in cache[0]]
 
 
     async def insert_group(self, groupid, alias):
@@ -828,39 +1276,90 @@ class MongoProvider(DatabaseProvider):
         """
         if not self._open:
             raise DBError('Cannot insert group, database connection not open!')
-        groupid = int(groupid)
+        self.invalidate('groups', groupid)
         try:
-            if not await self.does_group_exist(groupid):
-                self._conn[self._db].groups.insert_one(
-                    {
-                        "groupid": groupid,
-                        "alias": alias
-                    }
-                )
+            # upsert so the existence check and insert are one round-trip
+            result = await self._conn[self._db].groups.update_one(
+                {"groupid": groupid},
+                {"$setOnInsert": {
+                    "groupid": groupid,
+                    "alias": alias
+                }},
+                upsert=True
+            )
+        except pymongo.errors.DuplicateKeyError:
+            # a concurrent upsert inserted the group first
+            result = None
         except Exception as e:
             return False, DBError(f'ERROR: {str(e)}')
+        if result is None or result.upserted_id is None:
+            return False, DBError(f'ERROR: Group {groupid} already exists!')
         return True, None
 
 
-    async def insert_readings(self, readings, batch_size=DatabaseProvider.BATCH_SIZE):
+    async def insert_reading(self, reading):
+        """Inserts a single reading into the database.
+
+        Args:
+            reading (dict): The reading to insert into the database.
+        """
+        if not self._open:
+            raise DBError('Cannot insert reading, database connection not open!')
+        # a one reading batch, so single inserts share the bulk write path
+        inserted, e = await self.insert_readings([reading])
+        return inserted == 1, e
+
+
+    async def insert_readings(self, readings, batch_size=DatabaseProvider.BATCH_SIZE,
+            fast_insert=False):
         """Inserts multiple readings into the database.
 
         Args:
-            readings (list): A list of readings to insert into the database.
+            readings (iterable): The readings to insert into the database.
             batch_size (int): The amount of readings to insert per batch.
+            fast_insert (boolean): Whether to send the readings with an
+            unacknowledged (w=0) write concern (default: False). This gives
+            up error reporting, the server does not reply to the writes, so
+            rejected readings and failed batches are never reported.
+
+        Returns:
+            (tuple): The number of readings inserted (or sent, for fast
+            inserts) and a DBError, or None if every reading was either
+            inserted or already in the database.
         """
         if not self._open:
             raise DBError('Cannot insert readings, database connection not open!')
-        try:
-            index = 0
-            lim = len(readings)
-            while index < lim:
-                step = batch_size if index + batch_size < lim else lim - index
-                self._conn[self._db].readings.insert_many(readings[index:index+step])
-                index += step
-        except Exception as e:
-            return False, DBError(f'ERROR: {str(e)}')
-        return True, None
+        if fast_insert:
+            # fire-and-forget, the server does not reply to these writes
+            coll = self._conn[self._db].get_collection('readings',
+                write_concern=pymongo.WriteConcern(w=0))
+        else:
+            coll = self._conn[self._db].readings
+        inserted = 0
+        # build the write operations lazily and pull them off in batches,
+        #   so the readings are never copied into intermediate slices
+        pending = (pymongo.InsertOne(reading) for reading in readings)
+        while True:
+            ops = list(itertools.islice(pending, batch_size))
+            if not ops:
+                break
+            try:
+                # unordered so a duplicate reading does not abort the rest of
+                #   the batch, the server keeps going past write errors
+                result = await coll.bulk_write(ops, ordered=False)
+                inserted += result.inserted_count if result.acknowledged else len(ops)
+            except pymongo.errors.BulkWriteError as e:
+                details = e.details
+                inserted += details['nInserted']
+                errors = details['writeErrors']
+                print(f'WARNING: {len(errors)} readings were rejected!')
+                # duplicate readings are expected on replays, anything else
+                #   is reported to the caller
+                if any(error['code'] != 11000 for error in errors):
+                    return inserted, DBError(f'ERROR: {str(e)}')
+            except Exception as e:
+                return inserted, DBError(f'ERROR: {str(e)}')
+        return inserted, None
 
 
     async def insert_sensor(self, sensorid, groupid, alias):
@@ -873,37 +1372,160 @@ class MongoProvider(DatabaseProvider):
         """
         if not self._open:
             raise DBError('Cannot insert sensor, database connection not open!')
+        self.invalidate('sensors', groupid)
         try:
-            if not await self.does_sensor_exist(sensorid, groupid):
-                self._conn[self._db].sensors.insert_one({
+            # upsert so the existence check and insert are one round-trip
+            result = await self._conn[self._db].sensors.update_one(
+                {'sensorid': sensorid, 'groupid': groupid},
+                {'$setOnInsert': {
                     'sensorid': sensorid,
                     'groupid': groupid,
                     'alias': alias
-                })
+                }},
+                upsert=True
+            )
+        except pymongo.errors.DuplicateKeyError:
+            # a concurrent upsert inserted the sensor first
+            result = None
         except Exception as e:
             return False, DBError(f'ERROR: {str(e)}')
+        if result is None or result.upserted_id is None:
+            return False, DBError(f'ERROR: Sensor {sensorid} already exists in group {groupid}!')
         return True, None
 
 
+    def invalidate(self, kind, key=None):
+        """Discards any cached copies of the given kind of document, so the
+        next read goes to the database. Call this after modifying groups,
+        rtypes, or sensors outside of this provider.
+
+        Args:
+            kind (str): One of 'groups', 'rtypes', or 'sensors'.
+            key (int): The id of the group or rtype that changed, or the id
+            of the group whose sensors changed (default: None, invalidates
+            every cached document of the given kind).
+        """
+        if kind == 'groups':
+            self._groups_cache = (None, 0.0)
+            keyed_cache = self._group_exists_cache
+        elif kind == 'rtypes':
+            self._rtypes_cache = (None, 0.0)
+            keyed_cache = self._rtype_exists_cache
+        elif kind == 'sensors':
+            keyed_cache = self._sensors_cache
+        else:
+            raise ValueError(f'ERROR: Cannot invalidate unknown kind \'{kind}\'!')
+        if key is None:
+            keyed_cache.clear()
+        else:
+            keyed_cache.pop(key, None)
+
+
+    async def _next_id(self, counter):
+        """Atomically increments the named counter and returns the identifier
+        it hands out. Counters start from zero and are created on first use.
+
+        Args:
+            counter (str): The _id of the counter document to increment.
+
+        Returns:
+            (int): The identifier handed out by the counter.
+        """
+        # findAndModify increments and reads the counter in one round-trip,
+        #   so concurrent provisions never hand out the same identifier
+        doc = await self._conn[self._db].counters.find_one_and_update(
+            {'_id': counter},
+            {'$inc': {'seq': 1}},
+            upsert=True,
+            return_document=pymongo.ReturnDocument.AFTER
+        )
+        return doc['seq'] - 1
+
+
+    @_translate_errors
+    async def next_groupid(self):
+        """Allocates the next unused group identifier.
+
+        Returns:
+            (int): A group identifier that no other group has been given.
+        """
+        if not self._open:
+            raise DBError('Cannot allocate groupid, database connection not open!')
+        return await self._next_id('group')
+
+
+    @_translate_errors
+    async def next_sensorid(self, groupid):
+        """Allocates the next unused sensor identifier in the specified group.
+
+        Arguments:
+            groupid (int): A group identifier that the sensor will be provisioned with.
+
+        Returns:
+            (int): A sensor identifier that no other sensor in the group has
+            been given.
+        """
+        if not self._open:
+            raise DBError('Cannot allocate sensorid, database connection not open!')
+        return await self._next_id(f'sensor:{groupid}')
+
+
+    async def warmup(self):
+        """Establishes a pooled connection to the MongoDB server ahead of the
+        first request, the pool then fills up to MIN_POOL_SIZE in the
+        background.
+        """
+        if not self._open:
+            raise DBError('Cannot warm up connection pool, database connection not open!')
+        try:
+            await self._conn.admin.command('ping')
+        except Exception as e:
+            raise DBError from e
+
+
     def open(self):
         """Opens a connection to the backing database server."""
         if not self._open:
             try:
-                if self.__username is not None and self.__password is not None:
-                    self._conn = pymongo.MongoClient(
-                        self._conn_str,
-                        username=self.__username,
-                        password=self.__password
-                    )
-                else:
-                    self._conn = pymongo.MongoClient(
-                        self._conn_str
-                    )
+                # Motor runs every operation on the asyncio event loop, so
+                #   none of the providers methods block the server
+                # providers with the same server and user share one client,
+                #   and so one connection pool
+                entry = _CLIENTS.get(self._client_key)
+                if entry is None:
+                    entry = _CLIENTS[self._client_key] = [
+                        motor.motor_asyncio.AsyncIOMotorClient(
+                            self._conn_str, **self._client_kwargs()), 0]
+                entry[1] += 1
+                self._conn = entry[0]
                 self._open = True
             except Exception as e:
-                raise DBError(f'ERROR: {str(e)}')
-        
+                raise DBError from e
+
+
+    @_translate_errors
+    async def purge_readings_before(self, ts):
+        """Deletes every reading taken before the given time, regardless of
+        the sensor it belongs to.
+
+        Args:
+            ts (int): A UNIX timestamp, readings older than this are deleted.
+
+        Returns:
+            (int): The number of readings that are deleted.
+        """
+        if not self._open:
+            raise DBError('ERROR: Cannot purge readings from database, database connection is not open!')
+        # a single ranged delete over the ts index
+        result = await self._conn[self._db].readings.delete_many(
+            filter={
+                'ts': {'$lt': ts}
+            }
+        )
+        return result.deleted_count
 
+
+    @_translate_errors
     async def stats_group(self, groupid, rtypeid, start_ts, end_ts):
         """Returns the stats for an entire group of sensors as a Python generator.
 
@@ -921,16 +1543,32 @@ class MongoProvider(DatabaseProvider):
         # bail if we arent connected to the database
         if not self._open:
             raise DBError('Cannot retrieve stats for sensor, database connection not open!')
-        try:
-            sensors = [s async for s in self.get_sensors(groupid)]
-            aws = [self.stats_sensor(sensor['sensorid'], groupid, rtypeid, start_ts, end_ts) for sensor in sensors]
-            docs = await asyncio.gather(*aws)
-            for doc in docs:
-                yield doc
-        except Exception as e:
-            raise DBError(f'ERROR: {str(e)}')
-
-
+        # compute the stats for every sensor in the group in a single pass
+        pipeline = [
+            {"$match": {
+                    "groupid": groupid,
+                    "rtypeid": rtypeid,
+                    "ts": {"$gte": start_ts, "$lte": end_ts}
+                }
+            },
+            {"$group": dict(_STATS_GROUP, _id="$sensorid")},
+            {"$project": dict(_STATS_PROJECT, sensorid="$_id")}
+        ]
+        # pin the planner to the index that matches the whole predicate
+        cursor = self._conn[self._db].readings.aggregate(pipeline,
+            allowDiskUse=False, maxTimeMS=self.MAX_AGGREGATE_MS,
+            hint=_READINGS_BY_GROUP, batchSize=self.DOC_LIMIT)
+        docs = {doc['sensorid']: doc async for doc in cursor}
+        # sensors without readings in the period still get a stats entry
+        for sensor in await self.get_sensors(groupid):
+            stats = docs.get(sensor['sensorid'])
+            if stats is None:
+                stats = _empty_stats()
+                stats['sensorid'] = sensor['sensorid']
+            yield stats
+
+
+    @_translate_errors
     async def stats_sensor(self, sensorid, groupid, rtypeid, start_ts, end_ts):
         """Returns the stats for a specific sensor.
 
@@ -947,89 +1585,33 @@ class MongoProvider(DatabaseProvider):
         # bail if not connected to the database
         if not self._open:
             raise DBError('Cannot retrieve stats for sensor, database connection not open!')
-        # build the stats pipeline
+        # build the stats pipeline, the match is a single range scan over the
+        #   unique index and the server computes every stat in one $group
         pipeline = [
-            # filter by sensorid, groupid, and rtypeid
-            #   these are all indexed so this should be fast
-            {"$match": {
-                    "$and": [{
-                        "sensorid": {"$eq": sensorid},
-                        "groupid": {"$eq": groupid},
-                        "rtypeid": {"$eq": rtypeid}
-                    }]
-                }
-            },
-            # optimization step - sort descending by time
-            {"$sort":
-                {"ts": -1}
-            },
-            # filter by time
-            {"$match": {
-                    "ts": {"$lte": end_ts}
-                }
-            },
             {"$match": {
-                    "ts": {"$gte": start_ts}
+                    "sensorid": sensorid,
+                    "groupid": groupid,
+                    "rtypeid": rtypeid,
+                    "ts": {"$gte": start_ts, "$lte": end_ts}
                 }
             },
-            # project just the value field
-            {"$project": {"val": 1}},
-            # simultaneously determine the min, max, and avg
-            # TODO: We may be able to do this entirely in the above
-            #   project
-            # $facet allows for running simultaneous operations across a
-            #   collection without having to run through the collection each
-            #   with each operation
-            {"$facet": {
-                "min": [
-                    {"$group":
-                        {
-                            "_id": None,
-                            "value": {"$min": "$val"}
-                        }
-                    }
-                ],
-                "max": [
-                    {"$group":
-                        {
-                            "_id": None,
-                            "value": {"$max": "$val"}
-                        }
-                    }
-                ],
-                "avg": [
-                    {"$group":
-                        {
-                            "_id": None,
-                            "value": {"$avg": "$val"}
-                        }
-                    }
-                ]
-            }}
+            {"$group": dict(_STATS_GROUP, _id=None)},
+            {"$project": _STATS_PROJECT}
         ]
-        try:
-            # run the aggregation
-            doc = None
-            with self._conn[self._db].readings.aggregate(pipeline,
-                    allowDiskUse=True, maxTimeMS=self.MAX_AGGREGATE_MS) as cursor:
-                doc = cursor.next()
-            # build the stats container
-            stats = dict()
-            if doc and doc['min'] and doc['max'] and doc['avg']:
-                stats['min'] = doc['min'][0]['value']
-                stats['max'] = doc['max'][0]['value']
-                stats['avg'] = doc['avg'][0]['value']
-            else:
-                stats['min'] = 0
-                stats['max'] = 0
-                stats['avg'] = 0
-            # return the stats container
-            return stats
-        except Exception as e:
-            raise DBError(f'ERROR: {str(e)}')
+        # the pipeline fits well under the aggregation memory limit, so
+        #   never spill to disk and pin the planner to the unique index
+        # the pipeline produces a single document
+        cursor = self._conn[self._db].readings.aggregate(pipeline,
+            allowDiskUse=False, maxTimeMS=self.MAX_AGGREGATE_MS,
+            batchSize=1, hint=_READINGS_UNIQUE)
+        docs = await cursor.to_list(length=1)
+        # no readings in the period means the group emits no document
+        return docs[0] if docs else _empty_stats()
 
     
-    async def get_readings_by_period(self, sensorid, groupid, start_ts, end_ts):
+    @_translate_errors
+    async def get_readings_by_period(self, sensorid, groupid, start_ts, end_ts,
+            limit=None):
         """Returns all of the readings for a given time period for a given
         sensor.
 
@@ -1038,55 +1620,62 @@ class MongoProvider(DatabaseProvider):
             groupid (int): The id of the group the sensor belongs to.
             start_ts (datetime.datetime): The start time period.
             end_ts (datetime.datetime): The end time period.
+            limit (int): The maximum number of readings to return, newest
+            first, or None for every reading in the period (default: None).
         """
         # bail if not connected to the database
         if not self._open:
             raise DBError('Cannot retrieve sensor readings, database connection not open!')
-        try:
-            pipeline = [
-                # filter by sensorid and groupid
-                # these are all indexed so this should be fast
-                {"$match": {
-                        "$and": [{
-                            "sensorid": {"$eq": sensorid},
-                            "groupid": {"$eq": groupid}
-                        }]
-                    }
-                },
-                # optimization step - sort descending by time
-                {"$sort":
-                    {"ts": -1}
-                },
-                # filter by time
-                {"$match": {
-                        "ts": {"$lte": end_ts}
-                    }
-                },
-                {"$match": {
-                        "ts": {"$gte": start_ts}
-                    }
-                },
-                {"$project": {
-                    "_id": 0, 
-                    "groupid": 1, 
-                    "sensorid": 1, 
-                    "rtypeid": 1, 
-                    "ts": 1, 
-                    "val": 1}
+        pipeline = [
+            # filter by sensorid, groupid and time in a single stage so
+            #   the whole predicate is one bounded scan of the
+            #   (sensorid, groupid, ts desc) index
+            {"$match": {
+                    "sensorid": sensorid,
+                    "groupid": groupid,
+                    "ts": {"$gte": start_ts, "$lte": end_ts}
                 }
-            ]
-            with self._conn[self._db].readings.aggregate(pipeline,
-                    allowDiskUse=True, maxTimeMS=self.MAX_AGGREGATE_MS) as cursor:
-                for doc in cursor:
-                    yield doc
-        except Exception as e:
-            raise DBError(f'ERROR: {str(e)}')
+            },
+            # the index already yields this order, so the sort is free
+            #   but keeps the output order guaranteed
+            {"$sort":
+                {"ts": -1}
+            },
+            {"$project": {
+                "_id": 0,
+                "groupid": 1,
+                "sensorid": 1,
+                "rtypeid": 1,
+                "ts": 1,
+                "val": 1}
+            }
+        ]
+        if limit:
+            # a limit right after the sort lets the server stop the
+            #   index scan once it has enough readings
+            pipeline.insert(2, {"$limit": limit})
+        # pin the planner to the index that matches the whole predicate
+        cursor = self._conn[self._db].readings.aggregate(pipeline,
+            allowDiskUse=True, maxTimeMS=self.MAX_AGGREGATE_MS,
+            hint=_READINGS_BY_SENSOR, batchSize=self.PERIOD_BATCH_SIZE)
+        async for doc in cursor:
+            yield doc
 
 
 class _GenericSQLProvider(DatabaseProvider):
     """Defines a generic SQL database provider. Override the methods
     provided by this class in subclasses as necessary.
     """
+
+    # the number of rows fetched from the server at a time when streaming
+    ARRAY_SIZE = 1000
+
+    # the number of prepared statements kept open per connection
+    STATEMENT_CACHE_SIZE = 64
+
+    # the function computing the population standard deviation in the stats
+    #   queries, override this in dialects that name it differently
+    STDDEV = 'STDDEV_POP'
     
     def __init__(self, conn_str, db):
         """Returns an instance of a DatabaseProvider. Do not call this function.
@@ -1098,16 +1687,224 @@ class _GenericSQLProvider(DatabaseProvider):
             db (str): The name of the Senslify database.
         """
         DatabaseProvider.__init__(self, conn_str, db)
+        # cursors keyed by their SQL text, pyodbc only prepares a statement
+        #   again when a cursor executes different SQL than it did last time
+        self._statements = OrderedDict()
+
+
+    def _statement(self, sql):
+        """Returns the cursor dedicated to the given SQL text, creating it if
+        needed, so repeated executions reuse the prepared statement. Only
+        use these cursors in methods that finish with the result before
+        returning, never in generators.
+
+        Args:
+            sql (str): The SQL text the cursor will execute.
+
+        Returns:
+            (pyodbc.Cursor): A cursor that only ever executes sql.
+        """
+        cursor = self._statements.get(sql)
+        if cursor is None:
+            cursor = self._statements[sql] = self._conn.cursor()
+            # evict the least recently used statement
+            if len(self._statements) > self.STATEMENT_CACHE_SIZE:
+                self._statements.popitem(last=False)[1].close()
+        else:
+            self._statements.move_to_end(sql)
+        return cursor
+
+
+    def _limit(self, query, n):
+        """Restricts a SELECT query to its first n rows. Override this in
+        subclasses whose SQL dialect does not support LIMIT.
+
+        Args:
+            query (str): A SELECT query.
+            n (int): The maximum number of rows to return.
+
+        Returns:
+            (str): The query restricted to n rows.
+        """
+        return f'{query} LIMIT {int(n)}'
+
+
+    def _table_exists(self, cursor, table):
+        """Determines if a table exists in the database.
+
+        Args:
+            cursor (pyodbc.Cursor): The cursor to run the check with.
+            table (str): The name of the table.
+
+        Returns:
+            (boolean): Whether the table exists.
+        """
+        # unquoted names are folded to lower case by some databases, so
+        #   the name is compared case insensitively
+        query = 'SELECT 1 FROM INFORMATION_SCHEMA.TABLES WHERE UPPER(TABLE_NAME)=?'
+        return cursor.execute(query, (table.upper(),)).fetchone() is not None
+
+
+    def _create_index(self, name, table, columns):
+        """Builds a CREATE INDEX statement that does nothing when the index
+        already exists. Override this in subclasses whose SQL dialect does
+        not support IF NOT EXISTS.
+
+        Args:
+            name (str): The name of the index.
+            table (str): The table to index.
+            columns (str): The indexed columns, as they appear in the
+            statement.
+
+        Returns:
+            (str): The statement.
+        """
+        return f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})'
+
+
+    def _insert_missing(self, table, keys, columns):
+        """Builds an INSERT statement that skips the row when a row with the
+        same primary key already exists, so inserting is one atomic
+        statement instead of an existence check followed by an insert.
+        Override this in subclasses whose SQL dialect does not support
+        ON CONFLICT.
+
+        Args:
+            table (str): The table to insert into.
+            keys (tuple): The primary key columns of the table.
+            columns (tuple): Every column being inserted, keys first.
+
+        Returns:
+            (str): A parameterized statement taking one value per column.
+        """
+        params = ', '.join('?' for _ in columns)
+        return (f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({params}) '
+            f'ON CONFLICT ({", ".join(keys)}) DO NOTHING')
+
+
+    def _increment(self, table, column, key):
+        """Builds an UPDATE statement that increments a counter and returns
+        its new value, so reading and bumping the counter is one atomic
+        statement. Override this in subclasses whose SQL dialect does not
+        support RETURNING.
+
+        Args:
+            table (str): The table holding the counter.
+            column (str): The column holding the counter value.
+            key (str): The primary key column naming the counter.
+
+        Returns:
+            (str): A parameterized statement taking the counter name.
+        """
+        return f'UPDATE {table} SET {column}={column}+1 WHERE {key}=? RETURNING {column}'
+
+
+    def _next_id(self, counter, seed_query, params):
+        """Atomically increments the named counter in the COUNTERS table and
+        returns the identifier it hands out. A counter is created on first
+        use, starting after the largest identifier already stored.
+
+        Args:
+            counter (str): The name of the counter to increment.
+            seed_query (str): A query returning the largest identifier
+            already stored, used to seed a new counter.
+            params (tuple): The parameters of seed_query.
+
+        Returns:
+            (int): The identifier handed out by the counter.
+        """
+        update = self._increment('COUNTERS', 'seq', 'name')
+        insert = self._insert_missing('COUNTERS', ('name',), ('name', 'seq'))
+        try:
+            # the update holds the counter row lock until the commit, so
+            #   concurrent provisions, even from other processes, never
+            #   read the same value
+            row = self._statement(update).execute(update, (counter,)).fetchone()
+            if row is None:
+                # first use, a concurrent seed of the same counter waits on
+                #   this insert and is then skipped
+                seed = self._statement(seed_query).execute(seed_query, params).fetchone()
+                start = 0 if seed is None or seed[0] is None else seed[0] + 1
+                self._statement(insert).execute(insert, (counter, start))
+                row = self._statement(update).execute(update, (counter,)).fetchone()
+        except Exception as e:
+            self._conn.rollback()
+            raise DBError from e
+        finally:
+            self._conn.commit()
+        return row[0] - 1
+
+
+    def _stats_columns(self):
+        """Builds the select list shared by the stats queries.
+
+        Returns:
+            (str): The aggregate columns, in the order _stats_row expects.
+        """
+        # COUNT(val) rather than COUNT(*), so a sensor outer joined to no
+        #   readings counts zero
+        return f'AVG(val), MIN(val), MAX(val), {self.STDDEV}(val), COUNT(val)'
+
+
+    def _stats_row(self, row):
+        """Converts the aggregate columns of a stats query into the stats dict
+        the other providers return. An empty period aggregates to NULLs, which
+        are reported as zero.
+
+        Args:
+            row (pyodbc.Row): A row starting with the _stats_columns values.
+
+        Returns:
+            (dict): The avg, min, max, std, and n stats.
+        """
+        stats = _empty_stats()
+        for key, value in zip(('avg', 'min', 'max', 'std', 'n'), row):
+            if value is not None:
+                stats[key] = value
+        return stats
+
+
+    def _fetch_rows(self, cursor, size=None):
+        """Generator function that streams the rows of an executed query in
+        blocks of rows, rather than materializing the whole result.
+
+        Args:
+            cursor (pyodbc.Cursor): A cursor that has executed a query.
+            size (int): The number of rows fetched per block (default: None,
+            uses ARRAY_SIZE).
+        """
+        size = size or self.ARRAY_SIZE
+        rows = cursor.fetchmany(size)
+        while rows:
+            yield from rows
+            rows = cursor.fetchmany(size)
+
+
+    def _fetch_docs(self, cursor, size=None):
+        """Generator function that streams the rows of an executed query as
+        dicts keyed by column name, the shape the other providers return
+        documents in.
+
+        Args:
+            cursor (pyodbc.Cursor): A cursor that has executed a query.
+            size (int): The number of rows fetched per block (default: None,
+            uses ARRAY_SIZE).
+        """
+        # some databases report the names in upper case, the documents use
+        #   the lower case field names the schema is written with
+        names = [column[0].lower() for column in cursor.description]
+        for row in self._fetch_rows(cursor, size):
+            yield dict(zip(names, row))
 
 
     @staticmethod
-    @contextmanager
-    def get_connection(conn_str, db=None):
+    @asynccontextmanager
+    async def get_connection(conn_str, db=None):
         """Gets a connection to the backing database server.
 
-        This method shall be implemented as a generator function, shall yield
-        an instance of a DatabaseProvider, and shall close the provider when
-        done.
+        This method shall be implemented as an asynchronous generator function,
+        shall yield an instance of a DatabaseProvider, and shall close the
+        provider when done. Use it via 'async with'.
 
         Args:
             conn_str (str): The connection string to the database server.
@@ -1117,8 +1914,10 @@ class _GenericSQLProvider(DatabaseProvider):
             DatabaseProvider: A temporary database provider.
         """
         conn = pyodbc.connect(conn_str)
-        yield conn
-        conn.close()
+        try:
+            yield conn
+        finally:
+            conn.close()
 
 
     async def close(self):
@@ -1126,39 +1925,69 @@ class _GenericSQLProvider(DatabaseProvider):
         if not self._open:
             raise DBError('ERROR: Cannot determine if group exists. Database connection is not open!')
         try:
+            for cursor in self._statements.values():
+                cursor.close()
+            self._statements.clear()
             self._conn.close()
-            self._is_open = False
+            self._open = False
         except Exception as e:
-            raise DBError(str(e))
+            raise DBError from e
 
 
-    def init(self, migration=True):
+    def init(self, migration=True, force_reset=False):
         """Initializes the database with the initial table design dictated in
-        'Docs/DB.md'.
-
-        This command should either fail soft or prompt the user
-        to confirm deletion of the database if the database already exists.
+        'Docs/DB.md'. If the tables already exist, their data is kept and
+        any missing tables and indexes are created, unless force_reset is set.
 
         Arguments:
             migration (boolean): Whether the database is a migration database
             or not (default: True).
+            force_reset (boolean): Whether to drop the existing Senslify
+            tables first (default: False).
         """
-        if not self._open:
-            raise DBError('ERROR: Cannot determine if group exists. Database connection is not open!')
+        # init runs before the application starts, open the connection here
+        #   if the startup handler has not done so yet
+        self.open()
         try:
             with self._conn.cursor() as cursor:
+                if force_reset:
+                    print('Warning: Deleting Senslify tables!')
+                    # readings references the other tables, drop it first
+                    for table in ('READINGS', 'SENSORS', 'GROUPS', 'RTYPES', 'COUNTERS'):
+                        cursor.execute(f'DROP TABLE IF EXISTS {table}')
+                tables = [('READINGS', 'sensorid int, groupid int, rtypeid int, ts int, val decimal, PRIMARY KEY (sensorid, groupid, rtypeid, ts)')]
                 if not migration:
-                    cursor.execute('CREATE TABLE SENSORS (sensorid int, alias varchar(255), PRIMARY KEY(sensorid))')
-                    cursor.execute('CREATE TABLE GROUPS (groupid int, alias varchar(255), PRIMARY KEY(groupid))')
-                    cursor.execute('CREATE TABLE RTYPES (rtypeid int, alias varchar(255), PRIMARY KEY(rtypeid))')
-                cursor.execute('CREATE TABLE READINGS (sensorid int, groupid int, rtypeid int, ts int, value decimal, PRIMARY KEY (sensorid, groupid, rtypeid, ts))')
+                    tables = [
+                        ('GROUPS', 'groupid int, alias varchar(255), PRIMARY KEY(groupid)'),
+                        # sensor ids are only unique within their group
+                        ('SENSORS', 'sensorid int, groupid int, alias varchar(255), PRIMARY KEY(sensorid, groupid)'),
+                        ('RTYPES', 'rtypeid int, alias varchar(255), PRIMARY KEY(rtypeid)'),
+                        # the id counters used when provisioning groups and sensors
+                        ('COUNTERS', 'name varchar(64), seq int, PRIMARY KEY(name)')
+                    ] + tables
+                # existing tables keep their data, only missing ones are created
+                created = set()
+                for table, columns in tables:
+                    if not self._table_exists(cursor, table):
+                        cursor.execute(f'CREATE TABLE {table} ({columns})')
+                        created.add(table)
+                # mirror the Mongo readings indexes, the newest readings for a
+                #   sensor and the group stats become index range scans
+                cursor.execute(self._create_index('readings_sg_ts_desc', 'READINGS', 'sensorid, groupid, ts DESC'))
+                cursor.execute(self._create_index('readings_grt_ts_desc', 'READINGS', 'groupid, rtypeid, ts DESC'))
                 if not migration:
-                    cursor.execute('ALTER TABLE READINGS ADD FOREIGN KEY (sensorid) REFERENCES SENSORS(sensorid)')
-                    cursor.execute('ALTER TABLE READINGS ADD FOREIGN KEY (groupid) REFERENCES GROUPS(groupid)')
-                    cursor.execute('ALTER TABLE READINGS ADD FOREIGN KEY (rtypeid) REFERENCES RTYPES(rtypeid)')
+                    # deletes cascade in the database, readings reach their
+                    #   group through their sensor so every table has a
+                    #   single cascade path (SQL Server rejects multiple)
+                    # a table that already existed already has its keys
+                    if 'SENSORS' in created:
+                        cursor.execute('ALTER TABLE SENSORS ADD FOREIGN KEY (groupid) REFERENCES GROUPS(groupid) ON DELETE CASCADE')
+                    if 'READINGS' in created:
+                        cursor.execute('ALTER TABLE READINGS ADD FOREIGN KEY (sensorid, groupid) REFERENCES SENSORS(sensorid, groupid) ON DELETE CASCADE')
+                        cursor.execute('ALTER TABLE READINGS ADD FOREIGN KEY (rtypeid) REFERENCES RTYPES(rtypeid) ON DELETE CASCADE')
         except Exception as e:
             self._conn.rollback()
-            raise DBError(str(e))
+            raise DBError from e
         finally:
             self._conn.commit()
 
@@ -1171,19 +2000,18 @@ class _GenericSQLProvider(DatabaseProvider):
             groupid (int): A group identifier.
 
         Returns:
-            (int): The number of records that are deleted.
+            (int): The number of groups that are deleted, the sensors and
+            readings removed by the cascade are not counted.
         """
         if not self._open:
             raise DBError('ERROR: Cannot delete group, database connection is not open!')
-        count = 0
         try:
             with self._conn.cursor() as cursor:
-                count += cursor.execute('DELETE FROM SENSORS WHERE groupid=?', (groupid))
-                count += cursor.execute('DELETE FROM READINGS WHERE groupid=?', (groupid))
-                count += cursor.execute('DELETE FROM GROUPS WHERE groupid=?', (groupid))
+                # the foreign keys cascade the delete to sensors and readings
+                count = cursor.execute('DELETE FROM GROUPS WHERE groupid=?', (groupid)).rowcount
         except Exception as e:
             self._conn.rollback()
-            raise DBError(f'ERROR: {str(e)}')
+            raise DBError from e
         finally:
             self._conn.commit()
         return count
@@ -1203,13 +2031,12 @@ class _GenericSQLProvider(DatabaseProvider):
         """
         if not self._open:
             raise DBError('ERROR: Cannot delete reading from database, database connection is not open!')
-        count = 0
         try:
             with self._conn.cursor() as cursor:
-                count += cursor.execute('DELETE FROM READINGS WHERE sensorid=? AND groupid=? AND rtypeid=? AND ts=?', (sensorid, groupid, rtypeid, ts))
+                count = cursor.execute('DELETE FROM READINGS WHERE sensorid=? AND groupid=? AND rtypeid=? AND ts=?', (sensorid, groupid, rtypeid, ts)).rowcount
         except Exception as e:
             self._conn.rollback()
-            raise DBError(str(e))
+            raise DBError from e
         finally:
             self._conn.commit()
         return count
@@ -1229,7 +2056,6 @@ class _GenericSQLProvider(DatabaseProvider):
         """
         if not self._open:
             raise DBError('ERROR: Cannot delete readings from database, database connection is not open!')
-        count = 0
         try:
             if rtypeid:
                 query = 'DELETE FROM READINGS WHERE sensorid=? AND groupid=? AND rtypeid=?'
@@ -1238,10 +2064,10 @@ class _GenericSQLProvider(DatabaseProvider):
                 query = 'DELETE FROM READINGS WHERE sensorid=? AND groupid=?'
                 params = (sensorid, groupid)
             with self._conn.cursor() as cursor:
-                count += cursor.execute(query, params)
+                count = cursor.execute(query, params).rowcount
         except Exception as e:
             self._conn.rollback()
-            raise DBError(str(e))
+            raise DBError from e
         finally:
             self._conn.commit()
         return count
@@ -1255,18 +2081,18 @@ class _GenericSQLProvider(DatabaseProvider):
             rtypeid (int): A reading type identifier.
 
         Returns:
-            (int): The number of records that are deleted.
+            (int): The number of reading types that are deleted, the readings
+            removed by the cascade are not counted.
         """
-        count = 0
         if not self._open:
             raise DBError('ERROR: Cannot delete reading type, database connection is not open!')
         try:
             with self._conn.cursor() as cursor:
-                count += cursor.execute('DELETE FROM READINGS WHERE rtypeid=?', (rtypeid))
-                count += cursor.execute('DELETE FROM RTYPES WHERE rtypeid=?', (rtypeid))
+                # the foreign key cascades the delete to readings
+                count = cursor.execute('DELETE FROM RTYPES WHERE rtypeid=?', (rtypeid)).rowcount
         except Exception as e:
             self._conn.rollback()
-            raise DBError(f'ERROR: {str(e)}')
+            raise DBError from e
         finally:
             self._conn.commit()
         return count
@@ -1281,20 +2107,21 @@ class _GenericSQLProvider(DatabaseProvider):
             sensorid (int): A sensor identifier.
 
         Returns:
-            (int): The number of records that are deleted.
+            (int): The number of sensors that are deleted, the readings
+            removed by the cascade are not counted.
         """
         if not self._open:
             raise DBError('ERROR: Cannot delete sensor, database connection is not open!')
-        count = 0
         try:
             with self._conn.cursor() as cursor:
-                count += cursor.execute('DELETE FROM READINGS WHERE groupid=? AND sensorid=?', (groupid, sensorid))
-                count += cursor.execute('DELETE FROM SENSORS WHERE groupid=? AND sensorid=?', (groupid, sensorid))
+                # the foreign key cascades the delete to readings
+                count = cursor.execute('DELETE FROM SENSORS WHERE groupid=? AND sensorid=?', (groupid, sensorid)).rowcount
         except Exception as e:
             self._conn.rollback()
-            raise DBError(f'ERROR: {str(e)}')
+            raise DBError from e
         finally:
             self._conn.commit()
+        return count
 
 
     async def does_group_exist(self, groupid):
@@ -1309,12 +2136,12 @@ class _GenericSQLProvider(DatabaseProvider):
         if not self._open:
             raise DBError('ERROR: Cannot determine if group exists. Database connection is not open!')
         try:
-            with self._conn.cursor() as cursor:
-                if not cursor.execute('SELECT * FROM GROUPS WHERE groupid=?', (groupid)).fetchone(): 
-                    return False
-                return True
+            # only whether a row exists matters, so fetch a constant
+            query = self._limit('SELECT 1 FROM GROUPS WHERE groupid=?', 1)
+            cursor = self._statement(query)
+            return cursor.execute(query, (groupid)).fetchone() is not None
         except Exception as e:
-            raise DBError(f'ERROR: {str(e)}')
+            raise DBError from e
 
 
     async def does_rtype_exist(self, rtypeid):
@@ -1329,12 +2156,12 @@ class _GenericSQLProvider(DatabaseProvider):
         if not self._open:
             raise DBError('ERROR: Cannot determine if group exists. Database connection is not open!')
         try:
-            with self._conn.cursor() as cursor:
-                if not cursor.execute('SELECT * FROM RTYPES WHERE rtypeid=?', (rtypeid)).fetchone():
-                    return False
-                return True
+            # only whether a row exists matters, so fetch a constant
+            query = self._limit('SELECT 1 FROM RTYPES WHERE rtypeid=?', 1)
+            cursor = self._statement(query)
+            return cursor.execute(query, (rtypeid)).fetchone() is not None
         except Exception as e:
-            raise DBError(f'ERROR: {str(e)}')
+            raise DBError from e
 
 
     async def does_sensor_exist(self, sensorid, groupid):
@@ -1349,13 +2176,39 @@ class _GenericSQLProvider(DatabaseProvider):
         """
         if not self._open:
             raise DBError('ERROR: Cannot determine if group exists. Database connection is not open!')
+        try:
+            # only whether a row exists matters, so fetch a constant
+            query = self._limit('SELECT 1 FROM SENSORS WHERE groupid=? AND sensorid=?', 1)
+            cursor = self._statement(query)
+            return cursor.execute(query, (groupid, sensorid)).fetchone() is not None
+        except Exception as e:
+            raise DBError from e
+
+
+    async def find_missing_sensors(self, sensors):
+        """Determines which of the given sensors do not exist in the database
+        using a single query rather than one query per sensor.
+
+        Args:
+            sensors (set): A set of (sensorid, groupid) tuples to check for.
+
+        Returns:
+            (set): The subset of sensors that are not in the database.
+        """
+        if not self._open:
+            raise DBError('ERROR: Cannot determine if sensors exist. Database connection is not open!')
+        if not sensors:
+            return set()
+        sensors = list(sensors)
+        query = 'SELECT sensorid, groupid FROM SENSORS WHERE ' + ' OR '.join(
+            ['(sensorid=? AND groupid=?)'] * len(sensors))
+        params = [i for sensor in sensors for i in sensor]
         try:
             with self._conn.cursor() as cursor:
-                if not cursor.execute('SELECT * FROM SENSORS WHERE groupid=? AND sensorid=?', (groupid, sensorid)).fetchone():
-                    return False
-                return True
+                existing = {(row[0], row[1]) for row in cursor.execute(query, params).fetchall()}
         except Exception as e:
-            raise DBError(f'ERROR: {str(e)}')
+            raise DBError from e
+        return set(sensors) - existing
 
 
     async def find_max_groupid(self):
@@ -1368,7 +2221,7 @@ class _GenericSQLProvider(DatabaseProvider):
                 if not row: raise DBError
                 return row
         except Exception as e:
-            raise DBError(f'ERROR: {str(e)}')
+            raise DBError from e
 
 
     async def find_max_sensorid_in_group(self, groupid):
@@ -1386,50 +2239,63 @@ class _GenericSQLProvider(DatabaseProvider):
                 if not row: raise DBError
                 return row
         except Exception as e:
-            raise DBError(f'ERROR: {str(e)}')
+            raise DBError from e
 
 
     async def get_groups(self):
-        """Generator function used to get groups from the database."""
+        """Gets every group from the database.
+
+        Returns:
+            (list): A list of dicts, one for each group in the database.
+        """
         if not self._open:
             raise DBError('ERROR: Cannot determine if group exists. Database connection is not open!')
         try:
             with self._conn.cursor() as cursor:
-                for row in cursor.execute('SELECT * FROM GROUPS').fetchall():
-                    yield row
+                cursor.execute('SELECT * FROM GROUPS')
+                return list(self._fetch_docs(cursor))
         except Exception as e:
-            raise DBError(f'ERROR: {str(e)}')
+            raise DBError from e
 
 
     async def get_rtypes(self):
-        """Generator function used to get reading types from the database."""
+        """Gets every reading type from the database.
+
+        Returns:
+            (list): A list of dicts, one for each reading type in the database.
+        """
         if not self._open:
             raise DBError('ERROR: Cannot determine if group exists. Database connection is not open!')
         try:
             with self._conn.cursor() as cursor:
-                for row in cursor.execute('SELECT * FROM RTYPES').fetchall():
-                    yield row
+                cursor.execute('SELECT * FROM RTYPES')
+                return list(self._fetch_docs(cursor))
         except Exception as e:
-            raise DBError(f'ERROR: {str(e)}')
+            raise DBError from e
 
 
     async def get_sensors(self, groupid):
-        """Generator function used to get sensors from the database.
+        """Gets every sensor in a group from the database.
 
         Args:
             groupid (int): The id of the group to return sensors from.
+
+        Returns:
+            (list): A list of dicts, one for each sensor in the group.
         """
         if not self._open:
             raise DBError('ERROR: Cannot determine if group exists. Database connection is not open!')
         try:
             with self._conn.cursor() as cursor:
-                for row in cursor.execute('SELECT * FROM SENSORS').fetchall():
-                    yield row
+                cursor.execute('SELECT * FROM SENSORS WHERE groupid=?', (groupid,))
+                return list(self._fetch_docs(cursor))
         except Exception as e:
-            raise DBError(f'ERROR: {str(e)}')
+            raise DBError from e
 
 
-    async def get_readings(self, sensorid, groupid, rtypeid=None, limit=DatabaseProvider.DOC_LIMIT):
+    async def get_readings(self, sensorid, groupid, rtypeid=None,
+            limit=DatabaseProvider.DOC_LIMIT, raw=False, batch_size=None,
+            window=None):
         """Generator function for retrieving readings from the database.
 
         Args:
@@ -1437,21 +2303,32 @@ class _GenericSQLProvider(DatabaseProvider):
             groupid (int): The id of the group the sensor belongs to.
             rtypeid (int): The id of the rtype corresponding the reading type to return (default: None).
             limit (int): The number of readings to return in a single call (default: 100).
+            raw (boolean): Unused by this provider (default: False).
+            batch_size (int): The number of rows fetched from the server at a
+            time (default: None, uses ARRAY_SIZE).
+            window (int): Only return readings taken in the last window
+            seconds (default: None, no time bound).
         """
         if not self._open:
             raise DBError('ERROR: Cannot determine if group exists. Database connection is not open!')
         try:
-            if rtype:
-                query = 'SELECT * FROM READINGS WHERE sensorid=? AND groupid=? AND rtypeid=? ORDER BY ts DESC'
-                params = (sensorid, groupid, rtypeid)
-            else:
-                query = 'SELECT * FROM READINGS WHERE sensorid=? AND groupid=? ORDER BY ts DESC'
-                params = (sensorid, groupid)
+            query = 'SELECT * FROM READINGS WHERE sensorid=? AND groupid=?'
+            params = [sensorid, groupid]
+            # rtype 0 is a valid reading type, so compare against None
+            if rtypeid is not None:
+                query += ' AND rtypeid=?'
+                params.append(rtypeid)
+            if window is not None:
+                query += ' AND ts>=?'
+                params.append(int(time.time()) - window)
+            # the newest rows first, the limit stops the descending scan
+            query = self._limit(f'{query} ORDER BY ts DESC', limit)
             with self._conn.cursor() as cursor:
-                for row in cursor.execute(query, params).fetchall():
-                    yield row
+                cursor.execute(query, params)
+                for doc in self._fetch_docs(cursor, batch_size):
+                    yield doc
         except Exception as e:
-            raise DBError(f'ERROR: {str(e)}')
+            raise DBError from e
 
 
     async def insert_group(self, groupid, alias):
@@ -1460,17 +2337,25 @@ class _GenericSQLProvider(DatabaseProvider):
         Args:
             groupid (int): The id of the group.
             alias (str): The human readable alias for the group.
+
+        Returns:
+            (tuple): Whether the group was inserted and a DBError, or None if
+            it was. A group that already exists is not overwritten and is
+            reported as an error.
         """
         if not self._open:
             raise DBError('ERROR: Cannot determine if group exists. Database connection is not open!')
+        query = self._insert_missing('GROUPS', ('groupid',), ('groupid', 'alias'))
         try:
-            with self._conn.cursor() as cursor:
-                cursor.execute('INSERT INTO GROUPS VALUES (groupid=?, alias=?)', (groupid, alias))
+            count = self._statement(query).execute(query, (groupid, alias)).rowcount
         except Exception as e:
             self._conn.rollback()
-            raise DBError(f'ERROR: {str(e)}')
+            return False, DBError(f'ERROR: {str(e)}')
         finally:
             self._conn.commit()
+        if count == 0:
+            return False, DBError(f'ERROR: Group {groupid} already exists!')
+        return True, None
 
 
     async def insert_reading(self, reading):
@@ -1481,32 +2366,49 @@ class _GenericSQLProvider(DatabaseProvider):
         """
         if not self._open:
             raise DBError('ERROR: Cannot determine if group exists. Database connection is not open!')
-        self.insert_readings([reading])
+        inserted, e = await self.insert_readings([reading])
+        return inserted == 1, e
 
 
-    async def insert_readings(self, readings, batch_size=DatabaseProvider.BATCH_SIZE):
+    async def insert_readings(self, readings, batch_size=DatabaseProvider.BATCH_SIZE,
+            fast_insert=False):
         """Inserts multiple readings into the database.
 
         Args:
-            readings (list): A list of readings to insert into the database.
+            readings (iterable): The readings to insert into the database.
             batch_size (int): The amount of readings to insert per batch.
+            fast_insert (boolean): Unused by this provider (default: False).
+
+        Returns:
+            (tuple): The number of readings inserted and a DBError, or None if
+            every reading was inserted.
         """
         if not self._open:
             raise DBError('ERROR: Cannot determine if group exists. Database connection is not open!')
+        inserted = 0
+        # build the rows lazily and pull them off in batches, so neither the
+        #   readings nor the rows are ever copied into a full list
+        rows = ((r['groupid'], r['sensorid'], r['rtypeid'], r['ts'], r['val'])
+            for r in readings)
+        query = 'INSERT INTO READINGS (groupid, sensorid, rtypeid, ts, val) VALUES (?, ?, ?, ?, ?)'
         try:
-            for reading in readings:
-                groupid = reading['groupid']
-                sensorid = reading['sensorid']
-                rtypeid = reading['rtypeid']
-                ts = reading['ts']
-                val = reading['val']
-                with self._conn.cursor() as cursor:
-                    cursor.execute('INSERT INTO READINGS VALUES (groupid=?, sensorid=?, rtypeid=?, ts=?, val=?)', (groupid, sensorid, rtypeid, ts, val))
+            # one cursor and one prepared statement for every batch, pyodbc
+            #   sends each batch as a single parameter array
+            cursor = self._statement(query)
+            cursor.fast_executemany = True
+            while True:
+                batch = list(itertools.islice(rows, batch_size))
+                if not batch:
+                    break
+                cursor.executemany(query, batch)
+                inserted += len(batch)
         except Exception as e:
             self._conn.rollback()
-            raise DBError(f'ERROR: {str(e)}')
+            # the rollback discards every batch sent by this call
+            return 0, DBError(f'ERROR: {str(e)}')
         finally:
             self._conn.commit()
+        return inserted, None
 
 
     async def insert_sensor(self, sensorid, groupid, alias):
@@ -1516,17 +2418,52 @@ class _GenericSQLProvider(DatabaseProvider):
             sensorid (int): The id assigned to the sensorboard.
             groupid (int): The id of the group the sensorboard belongs to.
             alias (str): The human readable alias for the sensor.
+
+        Returns:
+            (tuple): Whether the sensor was inserted and a DBError, or None if
+            it was. A sensor that already exists is not overwritten and is
+            reported as an error.
         """
         if not self._open:
             raise DBError('ERROR: Cannot determine if group exists. Database connection is not open!')
+        query = self._insert_missing('SENSORS', ('sensorid', 'groupid'), ('sensorid', 'groupid', 'alias'))
         try:
-            with self._conn.cursor() as cursor:
-                cursor.execute('INSERT INTO SENSORS VALUES (sensorid=?, groupid=?, alias=?)', (sensorid, groupid, alias))
+            count = self._statement(query).execute(query, (sensorid, groupid, alias)).rowcount
         except Exception as e:
             self._conn.rollback()
-            raise DBError(f'ERROR: {str(e)}')
+            return False, DBError(f'ERROR: {str(e)}')
         finally:
             self._conn.commit()
+        if count == 0:
+            return False, DBError(f'ERROR: Sensor {sensorid} already exists in group {groupid}!')
+        return True, None
+
+
+    async def next_groupid(self):
+        """Allocates the next unused group identifier.
+
+        Returns:
+            (int): A group identifier that no other group has been given.
+        """
+        if not self._open:
+            raise DBError('ERROR: Cannot allocate groupid. Database connection is not open!')
+        return self._next_id('group', 'SELECT MAX(groupid) FROM GROUPS', ())
+
+
+    async def next_sensorid(self, groupid):
+        """Allocates the next unused sensor identifier in the specified group.
+
+        Arguments:
+            groupid (int): A group identifier that the sensor will be provisioned with.
+
+        Returns:
+            (int): A sensor identifier that no other sensor in the group has
+            been given.
+        """
+        if not self._open:
+            raise DBError('ERROR: Cannot allocate sensorid. Database connection is not open!')
+        return self._next_id(f'sensor:{groupid}',
+            'SELECT MAX(sensorid) FROM SENSORS WHERE groupid = ?', (groupid,))
 
 
     def open(self):
@@ -1536,19 +2473,41 @@ class _GenericSQLProvider(DatabaseProvider):
                 self._conn = pyodbc.connect(self._conn_str)
                 self._open = True
             except Exception as e:
-                raise DBError(f'ERROR: {str(e)}')
+                raise DBError from e
+
 
+    async def purge_readings_before(self, ts):
+        """Deletes every reading taken before the given time, regardless of
+        the sensor it belongs to.
 
-    async def stats_group(self, groupid, rtypeid, start_ts=None, end_ts=None):
+        Args:
+            ts (int): A UNIX timestamp, readings older than this are deleted.
+
+        Returns:
+            (int): The number of readings that are deleted.
+        """
+        if not self._open:
+            raise DBError('ERROR: Cannot purge readings from database, database connection is not open!')
+        try:
+            with self._conn.cursor() as cursor:
+                count = cursor.execute('DELETE FROM READINGS WHERE ts<?', (ts,)).rowcount
+        except Exception as e:
+            self._conn.rollback()
+            raise DBError from e
+        finally:
+            self._conn.commit()
+        return count
+
+
+    async def stats_group(self, groupid, rtypeid, start_ts, end_ts):
         """Returns the stats for an entire group of sensors.
 
         Args:
             groupid (int): The id of the group the sensor belongs to.
             rtypeid (int): The id of the reading type to retrieve stats for.
-            start_ts (datetime.datetime): The start time that begins the range
-            for stats (default:None).
-            end_ts (datetime.datetime): The end time that ends the range for
-            stats (default: None).
+            start_ts (int): The start time that begins the range for stats.
+            end_ts (int): The end time that ends the range for stats,
+            inclusive.
 
         Returns:
             (generator): A Python generator over the stats from the database.
@@ -1560,10 +2519,19 @@ class _GenericSQLProvider(DatabaseProvider):
             raise DBError('ERROR: Cannot determine if group exists. Database connection is not open!')
         try:
             with self._conn.cursor() as cursor:
-                for row in cursor.execute('SELECT AVG(val), MAX(val), MIN(val), sensorid, groupid FROM READINGS WHERE groupid=? AND rtypeid=? AND ts>=? and ts<? GROUPBY sensorid, groupid', (groupid, rtypeid, start_ts, end_ts)).fetchall():
-                    yield row
+                # the database reduces the readings, one row per sensor, the
+                #   outer join keeps sensors without readings in the period
+                #   so they report empty stats like the other providers
+                cursor.execute(f'SELECT {self._stats_columns()}, SENSORS.sensorid FROM SENSORS '
+                    'LEFT JOIN READINGS ON READINGS.sensorid=SENSORS.sensorid AND READINGS.groupid=SENSORS.groupid '
+                    'AND READINGS.rtypeid=? AND READINGS.ts>=? AND READINGS.ts<=? '
+                    'WHERE SENSORS.groupid=? GROUP BY SENSORS.sensorid', (rtypeid, start_ts, end_ts, groupid))
+                for row in self._fetch_rows(cursor):
+                    stats = self._stats_row(row)
+                    stats['sensorid'] = row[-1]
+                    yield stats
         except Exception as e:
-            raise DBError(f'ERROR: {str(e)}')
+            raise DBError from e
 
 
     async def stats_sensor(self, sensorid, groupid, rtypeid, start_ts, end_ts):
@@ -1584,30 +2552,40 @@ class _GenericSQLProvider(DatabaseProvider):
         if not self._open:
             raise DBError('ERROR: Cannot determine if group exists. Database connection is not open!')
         try:
-            with self._conn.cursor() as cursor:
-                return cursor.execute('SELECT AVG(val), MAX(val), MIN(val) WHERE sensorid=? AND groupid=? AND rtypeid=? AND ts>=? AND ts<?', (sensorid, groupid, rtypeid, ts)).fetchone()
+            # the database reduces the readings, only one row comes back
+            query = f'SELECT {self._stats_columns()} FROM READINGS WHERE sensorid=? AND groupid=? AND rtypeid=? AND ts>=? AND ts<=?'
+            row = self._statement(query).execute(query,
+                (sensorid, groupid, rtypeid, start_ts, end_ts)).fetchone()
+            return self._stats_row(row)
         except Exception as e:
-            raise DBError(f'ERROR: {str(e)}')
+            raise DBError from e
 
 
-    async def get_readings_by_period(self, sensorid, groupid, start_ts, end_ts):
+    async def get_readings_by_period(self, sensorid, groupid, start_ts, end_ts,
+            limit=None):
         """Returns all of the readings for a given time period for a given
         sensor.
 
         Args:
             sensorid (int): The id of the sensor to get readings for.
             groupid (int): The id of the group the sensor belongs to.
-            start_ts (datetime.datetime): The start time period.
-            end_ts (datetime.datetime): The end time period.
+            start_ts (int): The start time period.
+            end_ts (int): The end time period, inclusive.
+            limit (int): The maximum number of readings to return, newest
+            first, or None for every reading in the period (default: None).
         """
         if not self._open:
             raise DBError('ERROR: Cannot determine if group exists. Database connection is not open!')
         try:
             with self._conn.cursor() as cursor:
-                for row in cursor.execute().fetchall('SELECT * FROM READINGS WHERE sensorid=? AND groupid=? AND ts >= ? AND ts < ? ORDER BY ts DESC', (sensorid, groupid, start_ts, end_ts)):
-                    yield row
+                query = 'SELECT * FROM READINGS WHERE sensorid=? AND groupid=? AND ts >= ? AND ts <= ? ORDER BY ts DESC'
+                if limit:
+                    query = self._limit(query, limit)
+                cursor.execute(query, (sensorid, groupid, start_ts, end_ts))
+                for doc in self._fetch_docs(cursor):
+                    yield doc
         except Exception as e:
-            raise DBError(f'ERROR: {str(e)}')
+            raise DBError from e
 
 
 class PostGresProvider(_GenericSQLProvider):
@@ -1640,12 +2618,15 @@ class PostGresProvider(_GenericSQLProvider):
                 self._conn.maxwrite = 1024 * 1024 * 1024
                 self._open = True
             except Exception as e:
-                raise DBError(f'ERROR: {str(e)}')
+                raise DBError from e
 
 
 class SQLServerProvider(_GenericSQLProvider):
     """Defines a provider for a MS SQL Server instance."""
 
+    # SQL Server names the population standard deviation STDEVP
+    STDDEV = 'STDEVP'
+
     def __init__(self, conn_str, db):
         """Returns an instance of a DatabaseProvider. Do not call this function.
         All of the methods defined by the DatabaseProvider class will raise a
@@ -1655,4 +2636,75 @@ class SQLServerProvider(_GenericSQLProvider):
             conn_str (str): The connection string for the database server.
             db (str): The name of the Senslify database.
         """
-        _GenericSQLProvider.__init__(self, conn_str, db)
\ No newline at end of file
+        _GenericSQLProvider.__init__(self, conn_str, db)
+
+
+    def _limit(self, query, n):
+        """Restricts a SELECT query to its first n rows. SQL Server uses TOP
+        instead of LIMIT.
+
+        Args:
+            query (str): A SELECT query.
+            n (int): The maximum number of rows to return.
+
+        Returns:
+            (str): The query restricted to n rows.
+        """
+        return query.replace('SELECT ', f'SELECT TOP {int(n)} ', 1)
+
+
+    def _insert_missing(self, table, keys, columns):
+        """Builds an INSERT statement that skips the row when a row with the
+        same primary key already exists. SQL Server has no ON CONFLICT, so
+        this uses MERGE instead.
+
+        Args:
+            table (str): The table to insert into.
+            keys (tuple): The primary key columns of the table.
+            columns (tuple): Every column being inserted, keys first.
+
+        Returns:
+            (str): A parameterized statement taking one value per column.
+        """
+        params = ', '.join('?' for _ in columns)
+        names = ', '.join(columns)
+        match = ' AND '.join(f't.{key}=s.{key}' for key in keys)
+        values = ', '.join(f's.{column}' for column in columns)
+        return (f'MERGE INTO {table} WITH (HOLDLOCK) AS t '
+            f'USING (VALUES ({params})) AS s ({names}) ON {match} '
+            f'WHEN NOT MATCHED THEN INSERT ({names}) VALUES ({values});')
+
+
+    def _increment(self, table, column, key):
+        """Builds an UPDATE statement that increments a counter and returns
+        its new value. SQL Server has no RETURNING, so this uses OUTPUT
+        instead.
+
+        Args:
+            table (str): The table holding the counter.
+            column (str): The column holding the counter value.
+            key (str): The primary key column naming the counter.
+
+        Returns:
+            (str): A parameterized statement taking the counter name.
+        """
+        return f'UPDATE {table} SET {column}={column}+1 OUTPUT inserted.{column} WHERE {key}=?'
+
+
+    def _create_index(self, name, table, columns):
+        """Builds a CREATE INDEX statement that does nothing when the index
+        already exists. SQL Server has no IF NOT EXISTS for indexes, so this
+        checks sys.indexes instead.
+
+        Args:
+            name (str): The name of the index.
+            table (str): The table to index.
+            columns (str): The indexed columns, as they appear in the
+            statement.
+
+        Returns:
+            (str): The statement.
+        """
+        return (f"IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name=N'{name}' "
+            f"AND object_id=OBJECT_ID(N'{table}')) "
+            f'CREATE INDEX {name} ON {table} ({columns})')
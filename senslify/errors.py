@@ -13,11 +13,36 @@
 # Author: Christen Ford
 # Purpose: Defines methods for generating context-specific error Responses.
 
-import aiohttp, os, traceback, sys
+import aiohttp, functools, os, traceback
 
 
 class DBError(Exception):
-    pass
+    """Raised when an operation against the backing database fails. When
+    raised without a message from another exception ('raise DBError from e'),
+    the message is built from the causing exception only when it is needed.
+    """
+
+    def __str__(self):
+        if not self.args and self.__cause__ is not None:
+            return f'ERROR: {str(self.__cause__)}'
+        return Exception.__str__(self)
+
+
+# Error pages use a handful of fixed messages, so their encoded bodies are
+#   cached. The Response itself cannot be shared, aiohttp prepares each
+#   response against the request it answers.
+@functools.lru_cache(maxsize=128)
+def _error_body(text, status):
+    """Formats and encodes the body of an error page.
+
+    Arguments:
+        text (str): Informative flavor text.
+        status (int): The HTTP response code.
+
+    Returns:
+        (bytes): The UTF-8 encoded body.
+    """
+    return "HTTP Error {c}: \n\n{t}".format(t=text, c=status).encode('utf-8')
 
 
 def generate_error(text, status):
@@ -30,8 +55,8 @@ def generate_error(text, status):
     Returns:
         (aiohttp.web.Response): An aiohttp.web.Response object.
     """
-    resp = "HTTP Error {c}: \n\n{t}".format(t=text, c=status)
-    return aiohttp.web.Response(text=resp, status=status)
+    return aiohttp.web.Response(body=_error_body(text, status), status=status,
+        content_type='text/plain', charset='utf-8')
 
 
 def traceback_str(exception):
@@ -43,8 +68,13 @@ def traceback_str(exception):
     Returns:
         (str): A formatted traceback string.
     """
-    exc_type, exc_obj, exc_tb = sys.exc_info()
-    fname = os.path.split(exc_tb.tb_frame.f_code.co_filename)[1]
-    text = 'HTTP RESPONSE 403:\n\nError: {}\nType: {}\nFile: {}\nLine Number: {}\n\nTraceback:\n{}'.format(str(exception), exc_type, fname, exc_tb.tb_lineno,
-        ''.join(traceback.format_tb(exc_tb)))
+    # work from the exception itself rather than sys.exc_info(), so this
+    #   also works outside of the except block that caught it
+    te = traceback.TracebackException.from_exception(exception)
+    # the outermost frame is where the exception was handled
+    frame = te.stack[0] if te.stack else None
+    fname = os.path.basename(frame.filename) if frame else None
+    lineno = frame.lineno if frame else None
+    text = 'HTTP RESPONSE 403:\n\nError: {}\nType: {}\nFile: {}\nLine Number: {}\n\nTraceback:\n{}'.format(str(exception), type(exception), fname, lineno,
+        ''.join(te.stack.format()))
     return text
@@ -15,8 +15,21 @@
 
 import babel.dates
 import datetime
+import functools
+
+
+# the datetime patterns parsed once at import, keyed by format name,
+#   babel would otherwise tokenize the pattern string on every call
+_PATTERNS = {
+    'full': babel.dates.parse_pattern("EEEE, d. MMMM y 'at' HH:mm:ss"),
+    'medium': babel.dates.parse_pattern("EE dd.MM.y HH:mm:ss")
+}
+
+# the pattern filter_date formats with, parsed once at import
+_DATE_PATTERN = babel.dates.parse_pattern('YYYY-MM-dd')
     
 
+@functools.lru_cache(maxsize=4096)
 def filter_date(d, locale='en'):
     """Filters a Unix timestamp into a YYYY-MM-DD format suitable for 
     HTML date input controls.
@@ -28,9 +41,10 @@ def filter_date(d, locale='en'):
         (str): Date string in the form YYYY-MM-DD.
     """
     d = datetime.datetime.fromtimestamp(d).date()
-    return babel.dates.format_date(d, 'YYYY-MM-dd', locale=locale)
+    return babel.dates.format_date(d, _DATE_PATTERN, locale=locale)
 
 
+@functools.lru_cache(maxsize=4096)
 def filter_datetime(dt, fmt='medium', locale='en'):
     """'i18n' compliant datetime filter for jinja2.
     Taken from: https://stackoverflow.com/questions/4830535/how-do-i-format-a-date-in-jinja2
@@ -39,14 +53,9 @@ def filter_datetime(dt, fmt='medium', locale='en'):
         dt (datetime): The datetime instance to format.
         fmt (str): The format to use, either medium or full.
     """
-    if fmt == 'full':
-        fmt = "EEEE, d. MMMM y 'at' HH:mm:ss"
-    elif fmt == 'medium':
-        fmt = "EE dd.MM.y HH:mm:ss"
     # return medium dateformat by default
-    else:
-        fmt = "EE dd.MM.y HH:mm:ss"
-    return babel.dates.format_datetime(dt, fmt, locale=locale)
+    pattern = _PATTERNS.get(fmt, _PATTERNS['medium'])
+    return babel.dates.format_datetime(dt, pattern, locale=locale)
     
 
 def filter_reading(reading):
@@ -55,9 +64,28 @@ def filter_reading(reading):
     Args:
         reading (dict): A reading from a sensor.
     """
-    if type(reading) is not dict:
-        return 'Unable to generate format string, reading is not a dict!'
-    if 'ts' not in reading or 'val' not in reading:
+    # readings are nearly always well formed, so look the fields up directly
+    #   and only sort out what went wrong when a lookup fails
+    try:
+        ts = reading['ts']
+        val = reading['val']
+    except KeyError:
         return 'Unable to generate format string, reading does not contain all necessary information!'
-    dt = filter_datetime(reading['ts'])
-    return 'Time: {}, Value: {}'.format(dt, reading['val'])
+    except TypeError:
+        return 'Unable to generate format string, reading is not a dict!'
+    return f'Time: {filter_datetime(ts)}, Value: {val}'
+
+
+def filter_readings(readings):
+    """Generates the formatted strings for a batch of readings, in order.
+    Unlike filter_reading, this expects every reading to be a dict holding
+    'ts' and 'val', so it skips the per reading checks.
+
+    Args:
+        readings (iterable): Readings from a sensor.
+
+    Returns:
+        (list): The formatted string for each reading.
+    """
+    return [f'Time: {filter_datetime(reading["ts"])}, Value: {reading["val"]}'
+        for reading in readings]
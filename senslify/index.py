@@ -13,39 +13,75 @@
 # Author: Christen Ford
 # Purpose: Defines handlers for the index page.
 
-import aiohttp, aiohttp_jinja2
+import aiohttp, aiohttp_jinja2, time
 
 from senslify.errors import generate_error, traceback_str
 
 
-def build_sensors_url(request, group):
+# the number of seconds the rendered index page is cached for
+INDEX_CACHE_TTL = 15
+
+
+def build_sensors_url(base, group):
     """Helper function that creates a url for a given group.
 
     Arguments:
-        request (aiohttp.web.Request): The request that initiated the connection to the homepage.
-        group (int): Group information on one group from the database.
+        base (yarl.URL): The url of the 'sensors' resource, built once by the
+        caller rather than once per group.
+        group (dict): Group information on one group from the database.
 
     Returns:
-        (aiohttp.web.Response): An aiohttp.web.Response object.
+        (yarl.URL): The url of the sensors page for the group.
+    """
+    return base.with_query(
+        {
+            'groupid': group['groupid'],
+            'alias': group['alias']
+        }
+    )
+
+
+async def render_index(app):
+    """Renders the index page straight from the template environment, so it
+    can be rendered outside of a request, and caches the rendered page.
+
+    Arguments:
+        app (aiohttp.web.Application): The application serving the page.
+
+    Returns:
+        (bytes): The rendered page, or None if there are no groups.
+    """
+    # the provider hands back its own copies so the urls are attached in
+    #   place rather than building a second list for the template
+    groups = await app['db'].get_groups()
+    if not groups:
+        return None
+    base = app.router['sensors'].url_for()
+    for group in groups:
+        group['url'] = build_sensors_url(base, group)
+    template = aiohttp_jinja2.get_env(app).get_template('sensors/index.jinja2')
+    body = template.render(app=app, title='Home', groups=groups).encode('utf-8')
+    app['page_cache']['index'] = (body, time.monotonic())
+    return body
+
+
+async def index_startup_handler(app):
+    """Renders the index page ahead of the first visitor. A failure here is
+    not fatal, the page is rendered by the first request instead.
+
+    Arguments:
+        app (aiohttp.web.Application): The application serving the page.
     """
     try:
-        route = request.app.router['sensors'].url_for().with_query(
-            {
-                'groupid': group['groupid'],
-                'alias': group['alias']
-            }
-        )
-        return route
+        await render_index(app)
     except Exception as e:
-        if request.app.config['debug']:
-            return generate_error(traceback_str(e), 403)
-        else:
-            return generate_error('ERROR: Internal server issue occurred!', 403)
+        print(f'WARNING: Unable to pre-render the index page: {str(e)}')
 
 
-@aiohttp_jinja2.template('sensors/index.jinja2')
 async def index_handler(request):
-    """Defines a GET endpoint for the index page.
+    """Defines a GET endpoint for the index page. The page is the same for
+    every visitor, so the rendered page is served from memory for
+    INDEX_CACHE_TTL seconds.
 
     Arguments:
         request (aiohttp.web.Request): An aiohttp.Request object.
@@ -53,26 +89,17 @@ async def index_handler(request):
     Returns:
         (aiohttp.web.Response): An aiohttp.web.Response object.
     """
-    # can't pass the generator off for now, need to refactor this so we can
-    groups = []
-    try:
-        # get the group information from the database
-        async for group in request.app['db'].get_groups():
-            url = build_sensors_url(request, group)
-            # if there was an error building the info url, return the error page
-            if isinstance(url, aiohttp.web.Response):
-                return url
-            group['url'] = url
-            groups.append(group)
-    except Exception as e:
-        if request.app.config['debug']:
-            return generate_error(traceback_str(e), 403)
-        else:
-            return generate_error('ERROR: Internal server error occurred!', 403)
-    if not groups:
-        return generate_error('ERROR: No groups found in the database!', 403)
-    else:
-        return {
-            'title': 'Home',
-            'groups': groups
-        }
+    body, ts = request.app['page_cache'].get('index', (None, 0.0))
+    if body is None or time.monotonic() - ts >= INDEX_CACHE_TTL:
+        try:
+            body = await render_index(request.app)
+        except Exception as e:
+            if request.app['config'].debug:
+                return generate_error(traceback_str(e), 403)
+            else:
+                return generate_error('ERROR: Internal server error occurred!', 403)
+        # error pages are never cached, only the rendered listing
+        if body is None:
+            return generate_error('ERROR: No groups found in the database!', 403)
+    return aiohttp.web.Response(body=body, content_type='text/html',
+        charset='utf-8')
@@ -18,17 +18,129 @@
 #   they will always return data in the body of the Response as a serialized
 #   JSON object.
 
-import aiohttp
-import simplejson
-from random_word import RandomWords
+import aiohttp, asyncio, hashlib, orjson, pkgutil, random, time
 
-from senslify.errors import generate_error, traceback_str, DBError
-from senslify.filters import filter_reading
+from senslify.errors import generate_error, traceback_str
+from senslify.filters import filter_readings
+from senslify.serialize import dumps, json_response
 from senslify.sockets import message
 from senslify.verify import verify_rest_request
 
 
-word_gen = RandomWords()
+# the number of seconds serialized listings are cached for
+JSON_CACHE_TTL = 30
+
+# the number of serialized bytes buffered before a streamed response is
+#   written to the client
+STREAM_CHUNK_SIZE = 16 * 1024
+
+
+def _get_cached_json(request, key):
+    '''Returns the serialized JSON response body cached under key, if it has
+    not yet expired.
+
+    Arguments:
+        request (aiohttp.web.Request): The request that initiated the REST handler.
+        key (str): The name of the cached listing.
+
+    Returns:
+        (bytes): The cached response body or None.
+    '''
+    body, ts = request.app['json_cache'].get(key, (None, 0.0))
+    if body is not None and time.monotonic() - ts < JSON_CACHE_TTL:
+        return body
+    return None
+
+
+def _set_cached_json(request, key, body):
+    '''Caches a serialized JSON response body under key.
+
+    Arguments:
+        request (aiohttp.web.Request): The request that initiated the REST handler.
+        key (str): The name of the cached listing.
+        body (bytes): The serialized response body.
+    '''
+    request.app['json_cache'][key] = (body, time.monotonic())
+
+
+def _catalog_response(request, body):
+    '''Builds a JSON response for a serialized listing, tagged with an ETag
+    derived from the body. Clients that send the ETag back in an
+    If-None-Match header get an empty 304 response while the listing is
+    unchanged.
+
+    Arguments:
+        request (aiohttp.web.Request): The request that initiated the REST handler.
+        body (bytes): The serialized response body.
+
+    Returns:
+        (aiohttp.web.Response): The response.
+    '''
+    etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+    headers = {'ETag': etag, 'Cache-Control': f'max-age={JSON_CACHE_TTL}'}
+    tags = request.headers.get('If-None-Match')
+    if tags is not None:
+        tags = {tag.strip() for tag in tags.split(',')}
+        if '*' in tags or etag in tags or f'W/{etag}' in tags:
+            return aiohttp.web.Response(status=304, headers=headers)
+    return aiohttp.web.Response(body=body, content_type='application/json',
+        headers=headers)
+
+
+async def _stream_docs(request, docs, key='docs'):
+    '''Streams serialized documents to the client as a {key: [...]} JSON
+    object, writing the documents in chunks of about STREAM_CHUNK_SIZE bytes
+    as they arrive from the database instead of collecting them first. The
+    response is only started once the first chunk is full, so an error
+    before then is raised to the caller, which can still answer it with an
+    error page. An error after that point cannot be reported in the body,
+    so the connection is dropped instead, leaving the client with a
+    truncated transfer rather than a second response.
+
+    Arguments:
+        request (aiohttp.web.Request): The request that initiated the REST handler.
+        docs (async iterable): The documents, each serialized to JSON bytes.
+        key (str): The key the documents are listed under (default: 'docs').
+
+    Returns:
+        (aiohttp.web.StreamResponse): The finished, or aborted, response.
+    '''
+    resp = aiohttp.web.StreamResponse()
+    resp.content_type = 'application/json'
+    chunk = bytearray(f'{{"{key}": ['.encode('utf-8'))
+    separator = b''
+    try:
+        async for doc in docs:
+            chunk += separator
+            chunk += doc
+            separator = b', '
+            # batch the documents so each write to the socket carries many
+            if len(chunk) >= STREAM_CHUNK_SIZE:
+                if not resp.prepared:
+                    await resp.prepare(request)
+                await resp.write(bytes(chunk))
+                chunk.clear()
+        chunk += b']}'
+        if not resp.prepared:
+            await resp.prepare(request)
+        await resp.write(bytes(chunk))
+        await resp.write_eof()
+    except Exception as e:
+        if not resp.prepared:
+            raise
+        # the headers are already sent, so an error page can no longer
+        #   follow them, abort the transfer so the client sees it failed
+        print(f'ERROR: Aborted streaming response: {str(e)}')
+        resp.force_close()
+        if request.transport is not None:
+            request.transport.close()
+    return resp
+
+
+# the words aliases are built from, loaded once from the packaged wordlist
+_WORDS = tuple(pkgutil.get_data('senslify', 'data/words.txt').decode('utf-8').split())
+
+
 def _generate_alias(n=3):
     '''Returns an n-word plain-English alias separated by hyphens.
 
@@ -39,10 +151,7 @@ def _generate_alias(n=3):
         (str): A string containing hyphenated plain-English words.
     '''
     if n <= 0: n = 3
-    words = [word_gen.get_random_word() for i in range(n)]
-    words = [w for w in words if w]
-    alias = '-'.join(words)
-    return alias
+    return '-'.join(random.choices(_WORDS, k=n))
 
 
 async def _download_handler(request, params):
@@ -53,26 +162,27 @@ async def _download_handler(request, params):
         params (dict): A dictionary containing parameters for the target.
 
     Returns:
-        (aiohttp.web.Response) A Response object containing the results of
-        executing the downloads_handler as a serialized JSON object in its body.
-        Statistics are keyed via the 'download' key.
+        (aiohttp.web.StreamResponse) A StreamResponse object containing the
+        results of executing the downloads_handler as a serialized JSON object
+        in its body. Readings are keyed via the 'readings' key.
     """
     # validation is performed in the rest dispatching method
     try:
-        sensorid = int(params['sensorid'])
-        groupid = int(params['groupid'])
-        start_ts = int(params['start_ts'])
-        end_ts = int(params['end_ts'])
-        resp_body = dict()
-        # call the appropriate db handler based on target
-        resp_body['readings'] = await request.db.get_readings_by_period(sensorid, groupid, start_ts, end_ts)
+        sensorid = params['sensorid']
+        groupid = params['groupid']
+        start_ts = params['start_ts']
+        end_ts = params['end_ts']
+        # a period can hold any number of readings, so they are streamed
+        #   out as the database hands them over instead of collected
+        readings = request.app['db'].get_readings_by_period(sensorid, groupid,
+            start_ts, end_ts)
+        return await _stream_docs(request,
+            (dumps(doc) async for doc in readings), key='readings')
     except Exception as e:
         if request.app['config'].debug:
-            return aiohttp.web.Response(traceback_str(e), 403)
+            return generate_error(traceback_str(e), 403)
         else:
-            return aiohttp.web.Response('ERROR: Unable to understand target/parameters!', 403)
-    # the standard return - if we got here, then everything went ok
-    return aiohttp.web.Response(body=simplejson.dumps(resp_body))
+            return generate_error('ERROR: Unable to understand target/parameters!', 403)
 
 
 async def _find_handler(request, params):
@@ -92,34 +202,40 @@ async def _find_handler(request, params):
 
     try:
         target = params['target']
-        # target handler for groups
-        if target == 'groups':
-            for doc in request.app['db'].get_groups():
-                docs.append(doc)
-        # target handler for rtypes
-        elif target == 'rtypes':
-            for doc in request.app['db'].get_rtypes():
-                docs.append(doc)
+        # target handlers for groups and rtypes, both rarely change so the
+        #   serialized listings are served from memory
+        if target == 'groups' or target == 'rtypes':
+            body = _get_cached_json(request, target)
+            if body is None:
+                if target == 'groups':
+                    docs = await request.app['db'].get_groups()
+                else:
+                    docs = await request.app['db'].get_rtypes()
+                body = dumps({'docs': docs})
+                _set_cached_json(request, target, body)
+            return _catalog_response(request, body)
         # target handler for sensors
         elif target == 'sensors':
             groupid = params['groupid']
-            for doc in request.app['db'].get_sensors(groupid):
-                docs.append(doc)
+            docs = await request.app['db'].get_sensors(groupid)
+            return _catalog_response(request,
+                dumps({'docs': docs}))
         elif target == 'readings':
             sensorid = params['sensorid']
             groupid = params['groupid']
-            for doc in request.app['db'].get_readings(sensorid, groupid):
-                docs.append(doc)
+            # readings are the largest result set, serialize them straight
+            #   from the undecoded BSON documents and stream them out
+            readings = request.app['db'].get_readings(sensorid, groupid, raw=True)
+            return await _stream_docs(request,
+                (dumps(doc) async for doc in readings))
     except Exception as e:
-        if request.app.config['debug']:
+        if request.app['config'].debug:
             return generate_error(traceback_str(e), 403)
         else:
             return generate_error('ERROR: There was an issue understanding your request!', 403)
 
     # build and return the response
-    resp_body = []
-    resp_body['docs'] = docs
-    return aiohttp.web.Response(body=simplejson.dumps(resp_body))
+    return json_response({'docs': docs})
 
 
 async def _stats_handler(request, params):
@@ -136,17 +252,17 @@ async def _stats_handler(request, params):
     """
     # validation is performed in the rest dispatching method
     target = params['target']
-    groupid = int(params['groupid'])
-    rtypeid = int(params['rtypeid'])
-    start_ts = int(params['start_ts'])
-    end_ts = int(params['end_ts'])
+    groupid = params['groupid']
+    rtypeid = params['rtypeid']
+    start_ts = params['start_ts']
+    end_ts = params['end_ts']
     resp_body = dict()
     # call the appropriate db handler based on target
     try:
         if target == 'group':
             resp_body['stats'] = [doc async for doc in request.app['db'].stats_group(groupid, rtypeid, start_ts, end_ts)]
         elif target == 'sensor':
-            sensorid = int(params['sensorid'])
+            sensorid = params['sensorid']
             resp_body['stats'] = await request.app['db'].stats_sensor(sensorid, groupid, rtypeid, start_ts, end_ts)
     except Exception as e:
         if request.app['config'].debug:
@@ -154,7 +270,7 @@ async def _stats_handler(request, params):
         else:
             return generate_error('ERROR: There was an issue understanding your request!', 403)
     # the standard return - if we got here, then everything went ok
-    return aiohttp.web.Response(body=simplejson.dumps(resp_body))
+    return json_response(resp_body)
 
 
 async def _provision_handler(request, params):
@@ -175,20 +291,15 @@ async def _provision_handler(request, params):
 
     if target == 'sensor':
         sensor_alias = None
-        groupid = int(params['groupid'])
+        groupid = params['groupid']
         if 'alias' in params:
             sensor_alias = params['alias']
         else:
             sensor_alias = _generate_alias()
-        group_inserted = False
         try:
-            max_sensorid = None
-            try:
-                doc = await request.app['db'].find_max_sensorid_in_group(groupid)
-                max_sensorid = int(doc['max'])
-            except DBError:
-                max_sensorid = -1
-            sensorid = max_sensorid + 1
+            # the counter hands out each sensorid exactly once, even to
+            #   concurrent provisions in the same group
+            sensorid = await request.app['db'].next_sensorid(groupid)
             result, e = await request.app['db'].insert_sensor(sensorid, groupid, sensor_alias)
             if e:
                 raise e
@@ -200,25 +311,21 @@ async def _provision_handler(request, params):
         resp_body = dict()
         resp_body['sensorid'] = sensorid
         resp_body['sensor_alias'] = sensor_alias
-        if group_inserted:
-            resp_body['group_alias'] = group_alias
-        return aiohttp.web.Response(text=simplejson.dumps(resp_body), status=200)
+        return json_response(resp_body)
     elif target == 'group':
         if 'alias' in params:
             group_alias = params['alias']
         else:
             group_alias = _generate_alias()
         try:
-            max_groupid = None
-            try:
-                doc = await request.app['db'].find_max_groupid()
-                max_groupid = int(doc['max'])
-            except DBError:
-                max_groupid = -1
-            groupid = max_groupid + 1
+            groupid = await request.app['db'].next_groupid()
             result, e = await request.app['db'].insert_group(groupid, group_alias)
             if e:
                 raise e
+            # the cached group listing and index page no longer match the
+            #   database
+            request.app['json_cache'].pop('groups', None)
+            request.app['page_cache'].pop('index', None)
         except Exception as e:
             if request.app['config'].debug:
                 return generate_error(traceback_str(e), 403)
@@ -227,7 +334,7 @@ async def _provision_handler(request, params):
         resp_body = dict()
         resp_body['groupid'] = groupid
         resp_body['group_alias'] = group_alias
-        return aiohttp.web.Response(text=simplejson.dumps(resp_body), status=200)
+        return json_response(resp_body)
     else:
         return generate_error('ERROR: Invalid \'target\' specified! Must be one of \{\'sensor\', \'group\'\}.', 400)
 
@@ -239,15 +346,20 @@ async def _upload_handler(request, params):
         (request) A aiohttp.web.Request object.
     """
     try:
+        # validation in the rest dispatching method also types the fields
         readings = params['readings']
-        # broadcast to listeners
-        for reading in readings:
-            # generate the string version of the message for output on page
-            reading['rstring'] = filter_reading(reading)
-            # send the message to the room
-            await message(request.app['rooms'], reading['groupid'], reading['sensorid'], reading)
+        # the readings were validated and typed already so the string version
+        #   of each message for output on page is generated in one batch
+        for reading, rstring in zip(readings, filter_readings(readings)):
+            reading['rstring'] = rstring
+        # broadcast to listeners, sending to every room concurrently
+        await asyncio.gather(*(message(request.app['rooms'], reading['groupid'],
+            reading['sensorid'], reading) for reading in readings))
         # insert into database
-        await request.app['db'].insert_readings(readings)
+        inserted, e = await request.app['db'].insert_readings(readings,
+            fast_insert=bool(request.app['config'].get('fast_insert', False)))
+        if e:
+            raise e
     except Exception as e:
         if request.app['config'].debug:
             return generate_error(traceback_str(e), 403)
@@ -256,6 +368,16 @@ async def _upload_handler(request, params):
     return aiohttp.web.Response(text='OK', status=200)
 
 
+# maps each REST command to its handler
+_DISPATCH = {
+    'find': _find_handler,
+    'stats': _stats_handler,
+    'download': _download_handler,
+    'upload': _upload_handler,
+    'provision': _provision_handler
+}
+
+
 async def rest_handler(request):
     """Defines a GET handler for the '/rest' endpoint.
 
@@ -268,24 +390,22 @@ async def rest_handler(request):
     Args:
         request (aiohttp.web.Request): The web request that initiated the handler.
     """
+    # decode the body once, straight from bytes, and share it with the
+    #   verifier instead of letting each of them decode it again
+    try:
+        json = orjson.loads(await request.read())
+    except orjson.JSONDecodeError:
+        return generate_error('ERROR: Request body must be valid JSON!', 400)
     # verify the request
-    valid, reason = await verify_rest_request(request)
+    valid, reason = await verify_rest_request(request, json)
     if not valid:
         return generate_error(reason, 400)
-    json = await request.json()
     # get the parameters
     cmd = json['cmd']
     params = json['params']
     # pass off to the correct target handler
-    if cmd == 'find':
-        response = await _find_handler(request, params)
-    elif cmd == 'stats':
-        response = await _stats_handler(request, params)
-    elif cmd == 'download':
-        response = await _download_handler(request, params)
-    elif cmd == 'upload':
-        response = await _upload_handler(request, params)
-    elif cmd == 'provision':
-        response = await _provision_handler(request, params)
-    # return the response we get back fgrom the handler
-    return response
\ No newline at end of file
+    handler = _DISPATCH.get(cmd)
+    if handler is None:
+        return generate_error('ERROR: \'cmd\' must be one of {\'find\', \'stats\', \'download\', \'upload\', \'provision\'}!', 400)
+    # return the response we get back from the handler
+    return await handler(request, params)
\ No newline at end of file
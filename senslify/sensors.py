@@ -13,39 +13,34 @@
 # Author: Christen Ford
 # Description: Handles routes intended for the /sensors base route.
 
-import aiohttp, aiohttp_jinja2, asyncio
-import simplejson
+import aiohttp_jinja2
 
 from datetime import datetime
 
 from senslify.errors import generate_error, traceback_str
-from senslify.filters import filter_reading
 
 
-def build_info_url(request, sensor):
+def build_info_url(base, sensor):
     """Helper function that creates a url for a given sensor.
 
     This function is called primarily by the sensors_handler function to
     generate links to the sensor info page.
 
     Arguments:
-        (request): - The request that wants the sensor url.
-        (sensor): The sensor to generate a url for.
+        base (yarl.URL): The url of the 'info' resource, built once by the
+        caller rather than once per sensor.
+        sensor (dict): The sensor to generate a url for.
+
+    Returns:
+        (yarl.URL): The url of the info page for the sensor.
     """
-    try:
-        route = request.app.router['info'].url_for().with_query(
-            {
-                'sensorid': sensor['sensorid'],
-                'groupid': sensor['groupid'],
-                'alias': sensor['alias']
-            }
-        )
-        return route
-    except Exception as e:
-        if request.app.config['debug']:
-            return generate_error(traceback_str(e), 403)
-        else:
-            return generate_error('ERROR: Internal server issue occurred!', 403)
+    return base.with_query(
+        {
+            'sensorid': sensor['sensorid'],
+            'groupid': sensor['groupid'],
+            'alias': sensor['alias']
+        }
+    )
 
 
 @aiohttp_jinja2.template('sensors/info.jinja2')
@@ -87,7 +82,7 @@ async def info_handler(request):
     # TODO: There has to be a way where I don't have to save these to memory
     rtypes = None
     try:
-        rtypes = [i async for i in request.app['db'].get_rtypes()]
+        rtypes = await request.app['db'].get_rtypes()
     except Exception as e:
         if request.app['config'].debug:
             return generate_error(traceback_str(e), 403)
@@ -135,12 +130,9 @@ async def sensors_handler(request):
     try:
         groupid = int(request.query['groupid'])
         alias = request.query['alias']
-        async for sensor in request.app['db'].get_sensors(groupid):
-            url = build_info_url(request, sensor)
-            # if there was an error building the info url, return the error page
-            if isinstance(url, aiohttp.web.Response):
-                return url
-            sensor['url'] = url
+        base = request.app.router['info'].url_for()
+        for sensor in await request.app['db'].get_sensors(groupid):
+            sensor['url'] = build_info_url(base, sensor)
             sensors.append(sensor)
     except Exception as e:
         if request.app['config'].debug:
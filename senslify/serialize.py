@@ -0,0 +1,82 @@
+# THERE IS NO WARRANTY FOR THE PROGRAM, TO THE EXTENT PERMITTED BY
+# APPLICABLE LAW. EXCEPT WHEN OTHERWISE STATED IN WRITING THE COPYRIGHT
+# HOLDERS AND/OR OTHER PARTIES PROVIDE THE PROGRAM "AS IS" WITHOUT
+# WARRANTY OF ANY KIND, EITHER EXPRESSED OR IMPLIED, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE. THE ENTIRE RISK AS TO THE QUALITY AND
+# PERFORMANCE OF THE PROGRAM IS WITH YOU. SHOULD THE PROGRAM PROVE
+# DEFECTIVE, YOU ASSUME THE COST OF ALL NECESSARY SERVICING, REPAIR OR
+# CORRECTION.
+
+# Name: serialize.py
+# Since: Oct. 16th, 2026
+# Author: Christen Ford
+# Purpose: Houses the JSON serialization helpers shared by the REST API, the
+#   WebSocket handler, and the template engine. Everything is serialized with
+#   orjson, which writes straight to bytes.
+
+import aiohttp, decimal, orjson
+from bson.raw_bson import RawBSONDocument
+
+
+def json_default(obj):
+    '''Serializes the types orjson does not support natively.
+
+    Arguments:
+        obj (object): The object orjson could not serialize.
+
+    Returns:
+        (float): The value of a decimal, as SQL providers return in the val
+        field of readings.
+        (dict): The fields of an undecoded BSON document, as MongoProvider
+        returns for raw readings.
+
+    Raises:
+        (TypeError): If obj is of any other type.
+    '''
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, RawBSONDocument):
+        # decodes the fields straight from the BSON bytes, the readings
+        #   projection only holds numbers so orjson serializes the rest
+        return dict(obj.items())
+    raise TypeError(f'Type is not JSON serializable: {type(obj).__name__}')
+
+
+def dumps(obj):
+    '''Serializes an object to JSON.
+
+    Arguments:
+        obj (object): The JSON serializable object.
+
+    Returns:
+        (bytes): The UTF-8 encoded JSON document.
+    '''
+    return orjson.dumps(obj, default=json_default)
+
+
+def dumps_str(obj):
+    '''Serializes an object to JSON, for consumers that only accept text such
+    as WebSocket text frames and templates.
+
+    Arguments:
+        obj (object): The JSON serializable object.
+
+    Returns:
+        (str): The JSON document.
+    '''
+    return orjson.dumps(obj, default=json_default).decode('utf-8')
+
+
+def json_response(body, status=200):
+    '''Builds a JSON response, serializing the body straight to bytes.
+
+    Arguments:
+        body (object): The JSON serializable response body.
+        status (int): The HTTP response code (default: 200).
+
+    Returns:
+        (aiohttp.web.Response): The response.
+    '''
+    return aiohttp.web.Response(body=dumps(body), status=status,
+        content_type='application/json')
@@ -14,11 +14,11 @@
 # Description: Defines a handler for the info page WebSocket as well as various
 #   helper functions.
 
-import aiohttp
-import simplejson
+import aiohttp, orjson
 
 from senslify.errors import DBError, generate_error
-from senslify.filters import filter_reading
+from senslify.filters import filter_readings
+from senslify.serialize import dumps_str
 from senslify.verify import verify_ws_request
 
 
@@ -136,10 +136,12 @@ async def message(rooms, groupid, sensorid, msg):
     except KeyError:
         print("ERROR: KeyError has occurred sending message, 'rtypeid' not found!")
         return
+    # serialize once for every client in the room
+    data = dumps_str(resp)
     # steps through all clients in the room
     for ws, rtype in rooms[(groupid, sensorid)].items():
         if rtype == rtypeid:
-            await ws.send_str(simplejson.dumps(resp))
+            await ws.send_str(data)
 
 
 # Defines the handler for the info page WebSocket
@@ -164,18 +166,18 @@ async def ws_handler(request):
             resp = dict()
             resp["cmd"] = ""
             try:
-                js = simplejson.loads(msg.data)
-            except simplejson.JSONDecodeError:
+                js = orjson.loads(msg.data)
+            except orjson.JSONDecodeError:
                 resp["cmd"] = "RESP_ERROR"
                 resp["error"] = "ERROR: Request is not a properly formed JSON message!"
                 # send the response to the client
-                await ws.send_str(simplejson.dumps(resp))
+                await ws.send_str(dumps_str(resp))
                 continue
             status, reason = await verify_ws_request(request, js)
             if not status:
                 resp["cmd"] = "RESP_ERROR"
                 resp["error"] = reason
-                await ws.send_str(simplejson.dumps(resp))
+                await ws.send_str(dumps_str(resp))
                 continue
             cmd = js["cmd"]
             # 
@@ -187,7 +189,7 @@ async def ws_handler(request):
                 result = await _join(request.app["rooms"], groupid, sensorid, ws)
                 resp["cmd"] = "RESP_JOIN"
                 resp["join_status"] = result
-                await ws.send_str(simplejson.dumps(resp))
+                await ws.send_str(dumps_str(resp))
             # close the connection if the client requested it
             elif cmd == "RQST_CLOSE":
                 sensorid = int(js["sensorid"])
@@ -207,21 +209,24 @@ async def ws_handler(request):
                 if status:
                     readings = []
                     try:
-                        async for reading in request.app["db"].get_readings(sensorid, groupid, rtypeid):
-                            reading["rstring"] = filter_reading(reading)
-                            readings.append(reading)
+                        readings = [reading async for reading in
+                            request.app["db"].get_readings(sensorid, groupid, rtypeid)]
+                        # the database hands back well formed readings, so
+                        #   their strings are generated in one batch
+                        for reading, rstring in zip(readings, filter_readings(readings)):
+                            reading["rstring"] = rstring
                     except DBError as e:
                         print(e)
                         resp["cmd"] = "RESP_ERROR"
                         resp["error"] = "ERROR: There was an issue retrieving the top 100 readings for the new reading type from the database!"
-                        await ws.send_str(simplejson.dumps(resp))
+                        await ws.send_str(dumps_str(resp))
                         continue
                     resp["readings"] = readings
                 else:
                     resp["cmd"] = "RESP_ERROR"
                     resp["error"] = "ERROR: Unable to change stream!"
                 # send the response to the client
-                await ws.send_str(simplejson.dumps(resp))
+                await ws.send_str(dumps_str(resp))
             # handle requests for getting stats on sensors
             elif cmd == "RQST_SENSOR_STATS":
                 sensorid = int(js["sensorid"])
@@ -238,7 +243,7 @@ async def ws_handler(request):
                     resp["cmd"] = "RESP_STATS_ERROR"
                     resp["error"] = "ERROR: Cannot retrieve reading statistics, there was an issue with the database!"
                 # send the response to the client
-                await ws.send_str(simplejson.dumps(resp))
+                await ws.send_str(dumps_str(resp))
             elif cmd == "RQST_DOWNLOAD":
                 sensorid = int(js["sensorid"])
                 groupid = int(js["groupid"])
@@ -254,12 +259,12 @@ async def ws_handler(request):
                 except Exception as e:
                     resp["cmd"] = "RESP_DOWNLOAD_ERROR"
                     resp["error"] = "ERROR: Cannot retrieve readings for download, there was an issue with the database!"
-                await ws.send_str(simplejson.dumps(resp))
+                await ws.send_str(dumps_str(resp))
         elif msg.type == aiohttp.WSMsgType.ERROR:
             resp = dict()
             resp["cmd"] == "RESP_WS_ERROR"
             resp["error"] = "ERROR: WebSocket encountered an error: %s\nPlease refresh the page.".format(ws.exception())
-            await ws.send_str(simplejson.dumps(resp))
+            await ws.send_str(dumps_str(resp))
 
     await _leave(request.app["rooms"], groupid, sensorid, ws)
 
@@ -1,6 +1,6 @@
 import argparse, datetime, random, time, sys
 
-import requests, simplejson
+import requests
 
 
 # setup argparse so the user can change parameters from the command line
@@ -22,14 +22,14 @@ rtypeid = int(args.rtypeid)
 ip_addr = args.ip_addr
 
 # send a provisioning request joining group groupid
-json_rqst = simplejson.dumps({
+json_rqst = {
     'cmd': 'provision',
     'params': {
         'target': 'group',
         'groupid': groupid
     }
-})
-resp = requests.post(ip_addr + '/rest', data=json_rqst)
+}
+resp = requests.post(ip_addr + '/rest', json=json_rqst)
 if resp.status_code == 403:
     print(resp.text)
     sys.exit(1)
@@ -39,14 +39,14 @@ if 'group_alias' in group_json:
     group_alias = group_json['group_alias']
 
 
-json_rqst = simplejson.dumps({
+json_rqst = {
     'cmd': 'provision',
     'params': {
         'target': 'sensor',
         'groupid': groupid
     }
-})
-resp = requests.post(ip_addr + '/rest', data=json_rqst)
+}
+resp = requests.post(ip_addr + '/rest', json=json_rqst)
 if resp.status_code == 403:
     print(resp.text)
     sys.exit(1)
@@ -59,7 +59,7 @@ if 'sensor_alias' in sensor_json:
 # repeatedly generate and upload sensor data per the given interval
 while True:
     data = random.uniform(min_val, max_val)
-    json_resp = simplejson.dumps({
+    json_resp = {
         'cmd': 'upload',
         'params':{
             'readings': [
@@ -72,6 +72,6 @@ while True:
                 }
             ]
         }
-    })
-    requests.post(ip_addr + '/rest', data=json_resp)
+    }
+    requests.post(ip_addr + '/rest', json=json_resp)
     time.sleep(interval)
\ No newline at end of file
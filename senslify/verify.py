@@ -13,7 +13,12 @@
 # Author: Christen Ford
 # Description: Contains useful methods for verifying Senslify data objects.
 
-import simplejson
+import asyncio
+
+
+# The REST verifiers convert the parameters they check and store the converted
+#   values back into the request parameters, so the handlers use them as-is
+#   instead of converting every parameter a second time.
 
 
 async def _verify_find_request(request, params):
@@ -41,6 +46,7 @@ async def _verify_find_request(request, params):
         except Exception:
             return False, "ERROR: A parameter is of incorrect type!"
         if groupid < 0: return False, "ERROR: Request parameter 'groupid' must be >= 0!"
+        params["groupid"] = groupid
         if not await request.app["db"].does_group_exist(groupid):
             return False, "ERROR: No such group provisioned into the system!"
     elif target == "readings":
@@ -53,9 +59,15 @@ async def _verify_find_request(request, params):
             return False, "ERROR: A parameter is on incorrect type!"
         if groupid < 0: return False, "ERROR: Request parameter 'groupid' must be >= 0!"
         if sensorid < 0: return False, "ERROR: Request parameter 'sensorid' must be >= 0!"
-        if not await request.app["db"].does_group_exist(groupid):
+        params["groupid"] = groupid
+        params["sensorid"] = sensorid
+        # the lookups are independent, so run them concurrently
+        group_exists, sensor_exists = await asyncio.gather(
+            request.app["db"].does_group_exist(groupid),
+            request.app["db"].does_sensor_exist(sensorid, groupid))
+        if not group_exists:
             return False, "ERROR: No such group provisioned into the system!"
-        if not await request.app["db"].does_sensor_exist(sensorid, groupid):
+        if not sensor_exists:
             return False, "ERROR: No such sensor provisioned into the system!"
     return True, None
 
@@ -92,6 +104,7 @@ async def _verify_stats_request(request, params):
         if target == "sensor": 
             sensorid = int(params["sensorid"])
             if sensorid < 0: return False, "ERROR: Request parameter 'sensorid' must be >= 0!"
+            params["sensorid"] = sensorid
     except Exception:
         return False, "ERROR: A parameter is of incorrect type!"
     if groupid < 0: return False, "ERROR: Request parameter 'groupid' must be >= 0!"
@@ -99,13 +112,18 @@ async def _verify_stats_request(request, params):
     if start_ts < 0: return False, "ERROR: Request parameter 'start_ts' must be >= 0!"
     if end_ts < 0: return False, "ERROR: Request parameter 'end_ts' must be >= 0!"
     if start_ts >= end_ts: return False, "ERROR: Request parmeter 'start_ts must be < ''end_ts!"
-    if not await request.app["db"].does_group_exist(groupid):
-        return False, "ERROR: No such group provisioned into the system!"
+    params.update(groupid=groupid, rtypeid=rtypeid, start_ts=start_ts, end_ts=end_ts)
+    # the lookups are independent, so run them concurrently
+    checks = [request.app["db"].does_group_exist(groupid),
+        request.app["db"].does_rtype_exist(rtypeid)]
     if target == "sensor":
-        if sensorid < 0: return False, "ERROR: Request parameter 'sensorid' must be >= 0!"
-        if not await request.app["db"].does_sensor_exist(sensorid, groupid):
-            return False, "ERROR: No such sensor provisioned into the system!"
-    if not await request.app["db"].does_rtype_exist(rtypeid):
+        checks.append(request.app["db"].does_sensor_exist(sensorid, groupid))
+    group_exists, rtype_exists, *sensor_exists = await asyncio.gather(*checks)
+    if not group_exists:
+        return False, "ERROR: No such group provisioned into the system!"
+    if not all(sensor_exists):
+        return False, "ERROR: No such sensor provisioned into the system!"
+    if not rtype_exists:
         return False, "ERROR: No such reading type provisioned into the system!"
     return True, None
 
@@ -140,9 +158,14 @@ async def _verify_download_request(request, params):
     if start_ts < 0: return False, "ERROR: Request parameter 'start_ts' must be >= 0!"
     if end_ts < 0: return False, "ERROR: Request parameter 'end_ts' must be >= 0!"
     if start_ts >= end_ts: return False, "ERROR: Request parmeter 'start_ts must be < ''end_ts!"
-    if not await request.app["db"].does_group_exist(groupid):
+    params.update(groupid=groupid, sensorid=sensorid, start_ts=start_ts, end_ts=end_ts)
+    # the lookups are independent, so run them concurrently
+    group_exists, sensor_exists = await asyncio.gather(
+        request.app["db"].does_group_exist(groupid),
+        request.app["db"].does_sensor_exist(sensorid, groupid))
+    if not group_exists:
         return False, "ERROR: No such group provisioned into the system!"
-    if not await request.app["db"].does_sensor_exist(sensorid, groupid):
+    if not sensor_exists:
         return False, "ERROR: No such sensor provisioned into the system!"
     return True, None
 
@@ -165,6 +188,11 @@ async def _verify_upload_request(request, params):
     readings = params["readings"]
     if not isinstance(readings, list):
         return False, "ERROR: Request parameter 'readings' must be a JSON array!"
+    # collect the distinct identifiers so the database is only queried once
+    #   per distinct value instead of once per reading
+    groupids = set()
+    rtypeids = set()
+    sensors = set()
     for reading in readings:
         if "groupid" not in reading: return False, "ERROR: Request params requires 'groupid' field!"
         if "sensorid" not in reading: return False, "ERROR: Request params requires 'sensorid' field!"
@@ -183,12 +211,22 @@ async def _verify_upload_request(request, params):
         if sensorid < 0: return False, "ERROR: Request parameter 'sensorid' must be >= 0!"
         if rtypeid < 0: return False, "ERROR: Request parameter 'rtypeid' must be >= 0!"
         if ts < 0: return False, "ERROR: Request parameter 'ts' must be >= 0!"
-        if not await request.app["db"].does_group_exist(groupid):
-            return False, "ERROR: No such group provisioned into the system!"
-        if not await request.app["db"].does_sensor_exist(sensorid, groupid):
-            return False, "ERROR: No such sensor provisioned into the system!"
-        if not await request.app["db"].does_rtype_exist(rtypeid):
-            return False, "ERROR: No such reading type provisioned into the system!"
+        # the database layer expects typed fields
+        reading.update(groupid=groupid, sensorid=sensorid, rtypeid=rtypeid, val=val, ts=ts)
+        groupids.add(groupid)
+        rtypeids.add(rtypeid)
+        sensors.add((sensorid, groupid))
+    # the lookups are independent, so run them concurrently
+    group_checks = [request.app["db"].does_group_exist(groupid) for groupid in groupids]
+    rtype_checks = [request.app["db"].does_rtype_exist(rtypeid) for rtypeid in rtypeids]
+    results = await asyncio.gather(*group_checks, *rtype_checks,
+        request.app["db"].find_missing_sensors(sensors))
+    if not all(results[:len(group_checks)]):
+        return False, "ERROR: No such group provisioned into the system!"
+    if results[-1]:
+        return False, "ERROR: No such sensor provisioned into the system!"
+    if not all(results[len(group_checks):-1]):
+        return False, "ERROR: No such reading type provisioned into the system!"
     return True, None
 
 
@@ -217,6 +255,7 @@ async def _verify_provision_request(request, params):
         except Exception:
             return False, "ERROR: Request parameter 'groupid' must be an integer!"
         if groupid <= 0: return False, "ERROR: Request parameter 'groupid' must be >= 0!"
+        params["groupid"] = groupid
     if "alias" in params:
         if not params["alias"]: return False, "ERROR: Request parameter 'alias' must contain at least one (1) character!"
     return True, None
@@ -245,9 +284,13 @@ async def _verify_join_command(request, params):
         return False, "ERROR: A parameter is of incorrect type!"
     if groupid < 0: return False, "ERROR: Request parameter 'groupid' must be >= 0."
     if sensorid < 0: return False, "ERROR: Request parameter 'sensorid' must be >= 0."
-    if not await request.app["db"].does_group_exist(groupid):
+    # the lookups are independent, so run them concurrently
+    group_exists, sensor_exists = await asyncio.gather(
+        request.app["db"].does_group_exist(groupid),
+        request.app["db"].does_sensor_exist(sensorid, groupid))
+    if not group_exists:
         return False, "ERROR: No such group provisioned into the system!"
-    if not await request.app["db"].does_sensor_exist(sensorid, groupid):
+    if not sensor_exists:
         return False, "ERROR: No such sensor provisioned into the system!"
     return True, None
 
@@ -275,9 +318,13 @@ async def _verify_close_command(request, params):
         return False, "ERROR: A parameter is of incorrect type!"
     if groupid < 0: return False, "ERROR: Request parameter 'groupid' must be >= 0."
     if sensorid < 0: return False, "ERROR: Request parameter 'sensorid' must be >= 0."
-    if not await request.app["db"].does_group_exist(groupid):
+    # the lookups are independent, so run them concurrently
+    group_exists, sensor_exists = await asyncio.gather(
+        request.app["db"].does_group_exist(groupid),
+        request.app["db"].does_sensor_exist(sensorid, groupid))
+    if not group_exists:
         return False, "ERROR: No such group provisioned into the system!"
-    if not await request.app["db"].does_sensor_exist(sensorid, groupid):
+    if not sensor_exists:
         return False, "ERROR: No such sensor provisioned into the system!"
     return True, None
 
@@ -307,32 +354,43 @@ async def _verify_stream_command(request, params):
     return True, None
 
 
-async def verify_rest_request(request):
+# maps each REST command to the function verifying its parameters
+_REST_VERIFIERS = {
+    "find": _verify_find_request,
+    "stats": _verify_stats_request,
+    "download": _verify_download_request,
+    "upload": _verify_upload_request,
+    "provision": _verify_provision_request
+}
+
+# maps each WebSocket command to the function verifying it
+_WS_VERIFIERS = {
+    "RQST_JOIN": _verify_join_command,
+    "RQST_CLOSE": _verify_close_command,
+    "RQST_STREAM": _verify_stream_command,
+    "RQST_SENSOR_STATS": _verify_stats_request,
+    "RQST_DOWNLOAD": _verify_download_request
+}
+
+
+async def verify_rest_request(request, json):
     """Determines if a rest request is valid.
 
     Arguments:
         request (aiohttp.web.Request): The REST request to validate.
+        json (dict-like): The decoded body of the REST request.
 
     Returns:
         A tuple containing (boolean, str) indicating the whether the REST request is valid as well as a status string.
     """
-    json = await request.json()
+    if not isinstance(json, dict): return False, "ERROR: Request must be a JSON object!"
     # check if the command and parameters are present
     if "cmd" not in json: return False, "ERROR: Request requires 'cmd' field!"
     if "params" not in json: return False, "ERROR: Request requires 'params' field!"
-    cmd = json["cmd"]
-    params = json["params"]
-    if cmd == "find":
-        return await _verify_find_request(request, params)
-    elif cmd == "stats":
-        return await _verify_stats_request(request, params)
-    elif cmd == "download":
-        return await _verify_download_request(request, params)
-    elif cmd == "upload":
-        return await _verify_upload_request(request, params)
-    elif cmd == "provision":
-        return await _verify_provision_request(request, params)
-    else: return False, "ERROR: 'cmd' must be one of {'find', 'stats', 'download', 'upload', 'provision'}!"
+    verify = _REST_VERIFIERS.get(json["cmd"])
+    if verify is None:
+        return False, "ERROR: 'cmd' must be one of {'find', 'stats', 'download', 'upload', 'provision'}!"
+    return await verify(request, json["params"])
 
 
 async def verify_ws_request(request, json):
@@ -348,15 +406,7 @@ async def verify_ws_request(request, json):
         message if the boolean is True, and is None otherwise.
     """
     if "cmd" not in json: return False, "ERROR: Request requires 'cmd' field!"
-    cmd = json["cmd"]
-    if cmd == "RQST_JOIN":
-        return await _verify_join_command(request, json)
-    elif cmd == "RQST_CLOSE":
-        return await _verify_close_command(request, json)
-    elif cmd == "RQST_STREAM":
-        return await _verify_stream_command(request, json)
-    elif cmd == "RQST_SENSOR_STATS":
-        return await _verify_stats_request(request, json)
-    elif cmd == "RQST_DOWNLOAD":
-        return await _verify_download_request(request, json)
-    else: return False, "ERROR: 'cmd' must be one of {'RQST_JOIN', 'RQST_CLOSE', 'RQST_STREAM', 'RQST_SENSOR_STATS', 'RQST_DOWNLOAD'}!"
+    verify = _WS_VERIFIERS.get(json["cmd"])
+    if verify is None:
+        return False, "ERROR: 'cmd' must be one of {'RQST_JOIN', 'RQST_CLOSE', 'RQST_STREAM', 'RQST_SENSOR_STATS', 'RQST_DOWNLOAD'}!"
+    return await verify(request, json)
@@ -34,8 +34,8 @@ VERSION = '0.1.0'
 # What packages are required for this module to be executed?
 REQUIRED = [
     "aiohttp", "jinja2", "aiohttp-jinja2", "cchardet",
-    "config", "aiodns", "pymongo", "simplejson",
-    "markupsafe", "gevent", 'pyyaml', 'random-word',
+    "config", "aiodns", "babel", "motor", "orjson", "pymongo",
+    "markupsafe", 'pyyaml',
     'pyodbc'
 ]
 
@@ -43,6 +43,7 @@ REQUIRED = [
 EXTRAS = {
     # 'fancy feature': ['django'],
     'btlemon': ['click', 'click_shell', 'bluepy'],
+    'compression': ['pymongo[snappy,zstd]'],
     'docs': ['sphinx'],
     'xls2tsv': ['click', 'defusedxml', 'openpyxl', 'openpyxl-utilities'],
 }